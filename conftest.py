@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# ngameapp configures itself from the environment at import time. Point it at
+# a throwaway shared SQLite store and a fixed secret, so importing it in tests
+# never touches the save files, secret key or lock files in the working tree.
+os.environ.setdefault("GAME_PERSISTENCE", "sqlite")
+os.environ.setdefault("GAME_SHARED_STORE", "1")
+os.environ.setdefault("GAME_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="ngame-test-"), "game.db"))
+os.environ.setdefault("GAME_SECRET_KEY", "test-secret")
@@ -0,0 +1,350 @@
+"""
+Row‑level storage backends for the networking game.
+
+`Game` keeps its players in memory and, by default, persists them as one
+JSON document (optionally with an append‑only event log). For larger
+deployments a storage backend can be attached with `Game.use_storage`.
+The game then forwards every mutation event (see `Game._log_event`) to the
+backend, which updates only the rows that the mutation touched: completing
+a task rewrites one task row, the user's stats row and at most one module
+row, instead of re‑serializing every player.
+
+`SQLiteStorage` is the bundled implementation. It uses the standard
+library `sqlite3` module, so it has no extra dependencies. Because SQLite
+in WAL mode can be opened by several processes at once, it can also act as
+the single authoritative store for multiple server workers; see the
+`shared` option of `Game.use_storage`.
+
+Usage overview:
+
+```
+from networking_game import Game
+from game_storage import SQLiteStorage
+
+game = Game()
+game.use_storage(SQLiteStorage("game.db"))
+user = game.register_user("alice")      # inserts one users row
+game.assign_daily_tasks(user)           # inserts the new task rows
+game.complete_task(user, user.tasks[0].id)
+```
+"""
+
+from __future__ import annotations
+
+import contextlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from networking_game import Badge, Level, User
+
+
+class StorageBackend:
+    """Interface for persisting game state one user at a time.
+
+    Subclasses receive the same event records that `EventLog` writes and are
+    expected to apply each of them to their own representation of the
+    touched user. They must also be able to produce users on demand so a
+    game can be (re)built from the backend.
+    """
+
+    def record(self, event: Dict) -> None:
+        """Persist the effect of a single mutation event."""
+        raise NotImplementedError
+
+    def save_user(self, user: User) -> None:
+        """Write the complete state of a user, replacing any stored copy."""
+        raise NotImplementedError
+
+    def load_user(self, username: str, level_lookup: Dict[str, Level],
+                  badge_lookup: Dict[str, Badge]) -> Optional[User]:
+        """Return the stored user, or None if no such user exists."""
+        raise NotImplementedError
+
+    def usernames(self) -> List[str]:
+        """Return the names of all stored users."""
+        raise NotImplementedError
+
+    def rank_keys(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield ``(username, points, streak)`` for every stored user.
+
+        Used to seed the leaderboard of a lazily loaded game without
+        hydrating any users.
+        """
+        raise NotImplementedError
+
+    def load_users(self, level_lookup: Dict[str, Level],
+                   badge_lookup: Dict[str, Badge]) -> Iterator[User]:
+        """Yield every stored user."""
+        for username in self.usernames():
+            user = self.load_user(username, level_lookup, badge_lookup)
+            if user is not None:
+                yield user
+
+    def transaction(self):
+        """Return a context manager that makes enclosed writes atomic.
+
+        The transaction must exclude writers in other processes, and
+        re‑entering it from inside an open transaction must be a no‑op. The
+        context value is True only for the outermost transaction. Required
+        for games using the backend in shared mode.
+        """
+        raise NotImplementedError
+
+    def top_usernames(self, limit: int) -> List[str]:
+        """Return the first `limit` usernames in leaderboard order."""
+        raise NotImplementedError
+
+    def rank_window(self, username: str, window: int) -> Tuple[int, int, List[str]]:
+        """Locate a user in leaderboard order.
+
+        Returns:
+            A tuple of the user's zero‑based index, the total number of
+            users, and the usernames from ``max(0, index - window)`` through
+            ``index + window`` in leaderboard order.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class SQLiteStorage(StorageBackend):
+    """A `StorageBackend` that keeps users in an SQLite database.
+
+    State is normalized into ``users``, ``tasks``, ``badges`` and
+    ``module_points`` tables keyed by username, so each mutation event
+    becomes a single‑row INSERT, UPDATE or DELETE. The connection runs in
+    autocommit mode with write‑ahead logging, and is guarded by a lock so
+    it can be shared by the threads of one process. `transaction` uses
+    ``BEGIN IMMEDIATE``, which also serializes writers across processes.
+
+    Attributes:
+        filepath: Path of the database file, or ``":memory:"``.
+        timeout: Seconds to wait for another process's write lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username    TEXT PRIMARY KEY,
+            points      INTEGER NOT NULL DEFAULT 0,
+            level       TEXT,
+            streak      INTEGER NOT NULL DEFAULT 0,
+            last_active TEXT
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            username    TEXT NOT NULL,
+            id          TEXT NOT NULL,
+            description TEXT NOT NULL,
+            points      INTEGER NOT NULL,
+            category    TEXT NOT NULL,
+            module_name TEXT,
+            hint        TEXT,
+            completed   INTEGER NOT NULL DEFAULT 0,
+            due_date    TEXT,
+            hint_used   INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, id)
+        );
+        CREATE TABLE IF NOT EXISTS badges (
+            username TEXT NOT NULL,
+            badge_id TEXT NOT NULL,
+            PRIMARY KEY (username, badge_id)
+        );
+        CREATE TABLE IF NOT EXISTS module_points (
+            username    TEXT NOT NULL,
+            module_name TEXT NOT NULL,
+            points      INTEGER NOT NULL,
+            PRIMARY KEY (username, module_name)
+        );
+        CREATE INDEX IF NOT EXISTS users_rank ON users (points DESC, streak DESC, username);
+    """
+
+    # Leaderboard order, matching User.rank_key()
+    RANK_ORDER = "ORDER BY points DESC, streak DESC, username"
+
+    TASK_COLUMNS = ("id", "description", "points", "category", "module_name",
+                    "hint", "completed", "due_date", "hint_used")
+
+    def __init__(self, filepath: str, timeout: float = 30.0):
+        self.filepath = filepath
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(filepath, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if filepath != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def _insert_task(self, username: str, task: Dict) -> None:
+        placeholders = ", ".join("?" for _ in range(len(self.TASK_COLUMNS) + 1))
+        self._conn.execute(
+            f"INSERT OR IGNORE INTO tasks (username, {', '.join(self.TASK_COLUMNS)}) VALUES ({placeholders})",
+            (username, *(task.get(col) for col in self.TASK_COLUMNS)),
+        )
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._conn.in_transaction:
+                yield False
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield True
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def record(self, event: Dict) -> None:
+        kind = event["e"]
+        username = event["u"]
+        with self._lock:
+            # Every event implies the user exists; registration is idempotent
+            self._conn.execute("INSERT OR IGNORE INTO users (username) VALUES (?)", (username,))
+            if kind == "stats":
+                self._conn.execute(
+                    "UPDATE users SET points = ?, streak = ? WHERE username = ?",
+                    (event["p"], event["s"], username),
+                )
+            elif kind == "assign":
+                self._insert_task(username, event["task"])
+            elif kind == "expire":
+                self._conn.executemany(
+                    "DELETE FROM tasks WHERE username = ? AND id = ?",
+                    [(username, task_id) for task_id in event["ids"]],
+                )
+            elif kind == "complete":
+                with self.transaction():
+                    self._conn.execute(
+                        "UPDATE tasks SET completed = 1 WHERE username = ? AND id = ?",
+                        (username, event["t"]),
+                    )
+                    self._conn.execute(
+                        "UPDATE users SET last_active = ? WHERE username = ?",
+                        (event["d"], username),
+                    )
+                    for module_name, points in (event.get("m") or {}).items():
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO module_points (username, module_name, points) VALUES (?, ?, ?)",
+                            (username, module_name, points),
+                        )
+            elif kind == "hint":
+                self._conn.execute(
+                    "UPDATE tasks SET hint_used = 1 WHERE username = ? AND id = ?",
+                    (username, event["t"]),
+                )
+            elif kind == "level":
+                self._conn.execute(
+                    "UPDATE users SET level = ? WHERE username = ?",
+                    (event["l"], username),
+                )
+            elif kind == "badge":
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO badges (username, badge_id) VALUES (?, ?)",
+                    (username, event["b"]),
+                )
+
+    def save_user(self, user: User) -> None:
+        self.save_users([user])
+
+    def save_users(self, users: Iterable[User]) -> None:
+        """Write several users in a single transaction."""
+        with self.transaction():
+            for user in users:
+                data = user.to_dict()
+                username = data["username"]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO users (username, points, level, streak, last_active) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (username, data["points"], data["level"], data["streak"], data["last_active"]),
+                )
+                for table in ("tasks", "badges", "module_points"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE username = ?", (username,))
+                for task in data["tasks"]:
+                    self._insert_task(username, task)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO badges (username, badge_id) VALUES (?, ?)",
+                    [(username, badge_id) for badge_id in data["badges"]],
+                )
+                self._conn.executemany(
+                    "INSERT INTO module_points (username, module_name, points) VALUES (?, ?, ?)",
+                    [(username, name, pts) for name, pts in data["module_points"].items()],
+                )
+
+    def load_user(self, username: str, level_lookup: Dict[str, Level],
+                  badge_lookup: Dict[str, Badge]) -> Optional[User]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return None
+            tasks = self._conn.execute(
+                f"SELECT {', '.join(self.TASK_COLUMNS)} FROM tasks WHERE username = ? ORDER BY rowid",
+                (username,),
+            ).fetchall()
+            badges = self._conn.execute(
+                "SELECT badge_id FROM badges WHERE username = ? ORDER BY rowid", (username,)
+            ).fetchall()
+            modules = self._conn.execute(
+                "SELECT module_name, points FROM module_points WHERE username = ?", (username,)
+            ).fetchall()
+        data = {
+            "username": row["username"],
+            "points": row["points"],
+            "level": row["level"] or next(iter(level_lookup)),
+            "badges": [b["badge_id"] for b in badges],
+            "streak": row["streak"],
+            "last_active": row["last_active"],
+            "tasks": [
+                {**dict(t), "completed": bool(t["completed"]), "hint_used": bool(t["hint_used"])}
+                for t in tasks
+            ],
+            "module_points": {m["module_name"]: m["points"] for m in modules},
+        }
+        return User.from_dict(data, level_lookup=level_lookup, badge_lookup=badge_lookup)
+
+    def usernames(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT username FROM users ORDER BY username").fetchall()
+        return [row["username"] for row in rows]
+
+    def rank_keys(self) -> Iterator[Tuple[str, int, int]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT username, points, streak FROM users").fetchall()
+        for row in rows:
+            yield row["username"], row["points"], row["streak"]
+
+    def top_usernames(self, limit: int) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT username FROM users {self.RANK_ORDER} LIMIT ?", (limit,)
+            ).fetchall()
+        return [row["username"] for row in rows]
+
+    def rank_window(self, username: str, window: int) -> Tuple[int, int, List[str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT points, streak FROM users WHERE username = ?", (username,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(username)
+            points, streak = row["points"], row["streak"]
+            # Users strictly ahead in (points DESC, streak DESC, username) order
+            index = self._conn.execute(
+                "SELECT COUNT(*) FROM users WHERE points > ? "
+                "OR (points = ? AND streak > ?) "
+                "OR (points = ? AND streak = ? AND username < ?)",
+                (points, points, streak, points, streak, username),
+            ).fetchone()[0]
+            total = self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            start = max(0, index - window)
+            rows = self._conn.execute(
+                f"SELECT username FROM users {self.RANK_ORDER} LIMIT ? OFFSET ?",
+                (index - start + window + 1, start),
+            ).fetchall()
+        return index, total, [r["username"] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
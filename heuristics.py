@@ -0,0 +1,111 @@
+# heuristics.py — local quest scoring, used when Snowflake is unavailable
+#
+# Pure functions with no app or network side effects, so offline jobs (e.g.
+# re-scoring history after a rubric change with score_batch) can import them
+# without starting the game server.
+
+class KeywordMatcher:
+    """
+    Named keyword groups, each matched by plain substring scans.
+
+    `k in text` runs in C and each group stops at its first hit, which is
+    cheaper than a combined regex that has to try every keyword at every
+    position of the text. The result is exactly the groups for which
+    `any(k in text for k in kws)` holds.
+    """
+    def __init__(self, groups):
+        self.groups = {name: tuple(kws) for name, kws in groups.items()}
+
+    def match(self, text: str) -> set:
+        """Names of the groups with at least one keyword occurring in `text`."""
+        found = set()
+        for name, kws in self.groups.items():
+            for k in kws:
+                if k in text:
+                    found.add(name)
+                    break
+        return found
+
+_HEURISTIC_KEYWORDS = {
+    "outreach": KeywordMatcher({
+        "topic":  ["accessibility","design","los angeles"," la ","ux"],
+        "intro":  ["i'm","i am","student","engineer","uwaterloo","cs"],
+        "ask":    ["15","15-min","15 minute","15 minutes"],
+        "polite": ["thanks","appreciate","understand if not","no worries","totally fine if not"],
+    }),
+    "coffee": KeywordMatcher({
+        "depth": ["roadmap","a/b","experiment","tradeoff","stakeholder","impact"],
+    }),
+    "followup": KeywordMatcher({
+        "thanks": ["thanks","great meeting","appreciate"],
+    }),
+    "reciprocity": KeywordMatcher({
+        "offer": ["share","resource","intro","connect","notes","feedback","link"],
+    }),
+}
+_FOLLOWUP_TIMES = {"monday","tuesday","48h","2 days","early next week"}
+
+# Per quest type: (feature, points) pairs, the score below which tips are
+# given, and the tips. Features are computed by _heuristic_features.
+_HEURISTIC_RUBRIC = {
+    "outreach": (
+        [("long", 1), ("topic", 2), ("intro", 2), ("ask", 2), ("polite", 3)], 10,
+        ["Reference their work/location directly (e.g., “your accessibility case study in LA”).",
+         "Make a specific, time-boxed ask (e.g., 15 minutes next week).",
+         "Add a respectful opt-out line."],
+    ),
+    "coffee": (
+        [("few_questions", 3), ("open_ended", 3), ("depth", 2), ("variety", 2)], 10,
+        ["Ask ≤3 open-ended, product-specific questions (e.g., trade-offs, experiment design)."],
+    ),
+    "followup": (
+        [("timely", 3), ("thanks", 2)], 5,
+        ["Follow up within 48–72 hours (e.g., Monday). Keep the subject clear and short."],
+    ),
+    "reciprocity": (
+        [("offer", 3), ("detailed", 2)], 5,
+        ["Offer something concrete: relevant article, intro, or feedback summary."],
+    ),
+}
+
+def _question_lines(text: str):
+    return [q.strip("-• ").strip() for q in (text or "").split("\n") if q.strip()]
+
+def _question_features(qs) -> set:
+    f = set()
+    if 2 <= len(qs) <= 4: f.add("few_questions")
+    if any(q.endswith("?") for q in qs): f.add("open_ended")
+    if len(set([q.split()[0].lower() if q else "" for q in qs])) > 1: f.add("variety")
+    return f
+
+def _heuristic_features(qtype: str, text: str, choice: str = "") -> set:
+    t = (text or "").lower().strip()
+    if qtype == "coffee":
+        qs = _question_lines(text)
+        return _question_features(qs) | _HEURISTIC_KEYWORDS["coffee"].match(" ".join(qs).lower())
+    f = _HEURISTIC_KEYWORDS[qtype].match(t)
+    if qtype == "outreach" and len(t.split()) >= 30: f.add("long")
+    if qtype == "followup" and (choice or "").lower().strip() in _FOLLOWUP_TIMES: f.add("timely")
+    if qtype == "reciprocity" and len(t.split()) >= 10: f.add("detailed")
+    return f
+
+def heuristic_score(qtype: str, text: str, choice: str = ""):
+    rubric = _HEURISTIC_RUBRIC.get(qtype)
+    if rubric is None:
+        return 0, []
+    weights, tip_below, tips = rubric
+    feats = _heuristic_features(qtype, text, choice)
+    s = sum(points for name, points in weights if name in feats)
+    return max(0, min(s, 10)), (list(tips) if s < tip_below else [])
+
+def score_batch(qtype: str, texts, choices=None):
+    """
+    heuristic_score for many submissions of one quest type, e.g. to re-score
+    history after a rubric change. Returns a list of (score, tips) in input
+    order.
+    """
+    texts = list(texts)
+    choices = list(choices) if choices is not None else [""] * len(texts)
+    if len(choices) != len(texts):
+        raise ValueError("texts and choices must be the same length")
+    return [heuristic_score(qtype, t, c) for t, c in zip(texts, choices)]
@@ -23,6 +23,12 @@ structured learning modules. Key features include:
   connection, maintaining a long streak, reaching new levels, and
   completing modules.
 * **Leaderboards** for comparing user progress.
+* **Event logging**: mutations can be appended to a compact log that is
+  replayed on top of the last JSON snapshot when loading. A background
+  `Snapshotter` periodically folds the log into a fresh snapshot.
+* **Storage backends**: the same mutation events can be forwarded to a
+  row‑level backend (see `game_storage.SQLiteStorage`) so only touched
+  records are written.
 
 The code is designed to be easy to extend and integrate into a web or GUI
 application (for example, hooking it up to a Figma‑designed interface or
@@ -60,11 +66,25 @@ Author: ChatGPT
 
 from __future__ import annotations
 
+import contextlib
+import bisect
+import collections
 import dataclasses
 import datetime
+import functools
+import itertools
 import json
+import os
 import random
-from typing import Callable, Dict, List, Optional
+import stat
+import tempfile
+import threading
+import time
+import types
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 
 @dataclasses.dataclass
@@ -98,6 +118,86 @@ class Module:
     prerequisites: List[str] = dataclasses.field(default_factory=list)
 
 
+class ModuleGraph:
+    """Modules compiled into a prerequisite DAG.
+
+    Built once from a name → Module mapping: prerequisite lists are
+    resolved to names, reverse edges (``dependents``) are indexed, and the
+    modules are sorted topologically. A cycle raises ValueError. A
+    prerequisite naming an unknown module can never be mastered, so modules
+    depending on it stay locked.
+    """
+
+    def __init__(self, modules: Mapping[str, Module]):
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(modules)}
+        self.thresholds: Dict[str, int] = {name: m.mastery_threshold for name, m in modules.items()}
+        self.prerequisites: Dict[str, Tuple[str, ...]] = {}
+        self.unknown: Dict[str, int] = {}
+        dependents: Dict[str, List[str]] = {name: [] for name in modules}
+        for name, module in modules.items():
+            prereqs = tuple(dict.fromkeys(module.prerequisites))
+            self.prerequisites[name] = tuple(p for p in prereqs if p in modules)
+            self.unknown[name] = len(prereqs) - len(self.prerequisites[name])
+            for prereq in self.prerequisites[name]:
+                dependents[prereq].append(name)
+        self.dependents: Dict[str, Tuple[str, ...]] = {n: tuple(d) for n, d in dependents.items()}
+
+        # Kahn's algorithm; anything left with unmet edges is on a cycle
+        indegree = {name: len(prereqs) for name, prereqs in self.prerequisites.items()}
+        ready = collections.deque(name for name, k in indegree.items() if k == 0)
+        order: List[str] = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in self.dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.index):
+            cycle = [name for name, k in indegree.items() if k > 0]
+            raise ValueError(f"module prerequisites form a cycle: {', '.join(cycle)}")
+        self.order: Tuple[str, ...] = tuple(order)
+
+
+class ModuleProgress:
+    """A user's mastered and unlocked modules for one ModuleGraph.
+
+    Built from the user's module points, then kept current by `update`,
+    which only does work when a module's points cross its mastery
+    threshold.
+    """
+
+    __slots__ = ("graph", "mastered", "unlocked", "_missing")
+
+    def __init__(self, graph: ModuleGraph, module_points: Mapping[str, int]):
+        self.graph = graph
+        self.mastered = {name for name, threshold in graph.thresholds.items()
+                         if module_points.get(name, 0) >= threshold}
+        # Number of prerequisites not yet mastered, per module
+        self._missing = {
+            name: graph.unknown[name] + sum(1 for p in prereqs if p not in self.mastered)
+            for name, prereqs in graph.prerequisites.items()
+        }
+        self.unlocked = {name for name, missing in self._missing.items() if missing == 0}
+
+    def update(self, module_name: str, old_points: int, new_points: int) -> None:
+        """Account for a module's points changing from old to new."""
+        threshold = self.graph.thresholds.get(module_name)
+        if threshold is None or (old_points >= threshold) == (new_points >= threshold):
+            return
+        if new_points >= threshold:
+            self.mastered.add(module_name)
+            for dependent in self.graph.dependents[module_name]:
+                self._missing[dependent] -= 1
+                if self._missing[dependent] == 0:
+                    self.unlocked.add(dependent)
+        else:
+            self.mastered.discard(module_name)
+            for dependent in self.graph.dependents[module_name]:
+                self._missing[dependent] += 1
+                self.unlocked.discard(dependent)
+
+
 @dataclasses.dataclass
 class Task:
     """Represents a task or challenge within the networking game.
@@ -154,8 +254,158 @@ class Task:
             return self.hint
         return None
 
+    def to_dict(self) -> Dict:
+        """Serialize the task to a JSON‑serializable dictionary."""
+        data = dataclasses.asdict(self)
+        data["due_date"] = self.due_date.isoformat() if self.due_date else None
+        return data
 
-@dataclasses.dataclass
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Task":
+        """Deserialize a task from the dictionary produced by `to_dict()`."""
+        return cls(
+            id=data["id"],
+            description=data["description"],
+            points=data["points"],
+            category=data["category"],
+            module_name=data.get("module_name"),
+            hint=data.get("hint"),
+            completed=data.get("completed", False),
+            due_date=datetime.date.fromisoformat(data["due_date"]) if data.get("due_date") else None,
+            hint_used=data.get("hint_used", False),
+        )
+
+
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _base36(n: int) -> str:
+    digits = []
+    while True:
+        n, r = divmod(n, 36)
+        digits.append(_BASE36[r])
+        if not n:
+            return "".join(reversed(digits))
+
+
+# Id generators alive in this process. In a forked child they either pick a
+# fresh node or refuse to run, so forked workers never share an id space.
+_per_process_generators: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _generators_after_fork() -> None:
+    for generator in list(_per_process_generators):
+        generator._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_generators_after_fork)
+
+
+class CounterIdGenerator:
+    """Task ids from a per‑process counter behind a node prefix.
+
+    Calling the generator with a category prefix returns
+    ``prefix + node + counter`` (counter in hex). By default the node is 8
+    base‑36 characters drawn from os.urandom, redrawn in forked children, so
+    ids are unique within a process by construction and across processes
+    with overwhelming probability. No clock is read.
+
+    A fixed `node` names a process; the start time (milliseconds, base 36)
+    is appended to it so a restarted process does not repeat the ids of its
+    predecessor. A fixed‑node generator cannot be shared with forked
+    children: using it after a fork raises RuntimeError.
+    """
+
+    _start_lock = threading.Lock()
+    _last_start = 0
+
+    def __init__(self, node: Optional[str] = None):
+        self._fixed_node = node
+        self._forked = False
+        self._reseed()
+        _per_process_generators.add(self)
+
+    def _reseed(self) -> None:
+        if self._fixed_node is None:
+            self.node = _base36(int.from_bytes(os.urandom(5), "big")).rjust(8, "0")
+        else:
+            with CounterIdGenerator._start_lock:
+                # Strictly increasing, so two generators never share a start
+                start = max(time.time_ns() // 1_000_000, CounterIdGenerator._last_start + 1)
+                CounterIdGenerator._last_start = start
+            self.node = self._fixed_node + _base36(start).rjust(9, "0")
+        # itertools.count is advanced atomically under the GIL
+        self._counter = itertools.count()
+
+    def _after_fork(self) -> None:
+        if self._fixed_node is None:
+            self._reseed()
+        else:
+            self._forked = True
+
+    def __call__(self, prefix: str) -> str:
+        if self._forked:
+            raise RuntimeError(f"id generator for node {self._fixed_node!r} was inherited by a "
+                               "forked process; create one per process with a distinct node")
+        return f"{prefix}{self.node}{next(self._counter):x}"
+
+
+class SnowflakeIdGenerator:
+    """Time‑ordered 64‑bit task ids, rendered in base 36 after the prefix.
+
+    Layout: 41 bits of milliseconds since `epoch_ms`, 10 bits of node id
+    and a 12‑bit sequence. When more than 4096 ids are requested in one
+    millisecond, or the wall clock steps backwards, the generator keeps
+    counting from the last timestamp it used instead of waiting, so ids
+    stay unique and increasing.
+
+    Uniqueness across processes rests entirely on `node_id`, so it must be
+    given explicitly and be distinct for every process issuing ids (e.g. a
+    worker index). A generator inherited by a forked child raises
+    RuntimeError instead of sharing its parent's node.
+    """
+
+    EPOCH_MS = 1704067200000  # 2024‑01‑01T00:00:00Z
+
+    def __init__(self, node_id: int, epoch_ms: int = EPOCH_MS):
+        if not 0 <= node_id < 1024:
+            raise ValueError("node_id must be between 0 and 1023")
+        self.node_id = node_id
+        self.epoch_ms = epoch_ms
+        self._forked = False
+        self._last = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+        _per_process_generators.add(self)
+
+    def _after_fork(self) -> None:
+        self._forked = True
+        # A lock held by another thread at fork time would never be released
+        self._lock = threading.Lock()
+
+    def next_int(self) -> int:
+        """Return the next id as an integer."""
+        if self._forked:
+            raise RuntimeError(f"id generator for node {self.node_id} was inherited by a "
+                               "forked process; create one per process with a distinct node_id")
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - self.epoch_ms
+            if now <= self._last:
+                now = self._last
+                self._sequence = (self._sequence + 1) & 0xFFF
+                if self._sequence == 0:
+                    now += 1  # sequence exhausted: borrow the next millisecond
+            else:
+                self._sequence = 0
+            self._last = now
+            return (now << 22) | (self.node_id << 12) | self._sequence
+
+    def __call__(self, prefix: str) -> str:
+        return prefix + _base36(self.next_int())
+
+
+@dataclasses.dataclass(frozen=True)
 class Badge:
     """Represents an achievement badge awarded when a condition is met.
 
@@ -165,11 +415,147 @@ class Badge:
         description: Explanation of why the badge was awarded.
         condition: A callable taking a User and returning True if the badge
             criteria are satisfied.
+        depends_on: The user fields the condition reads ("points",
+            "streak", "level", "module_points" or "module_points:<module
+            name>"). The badge is only re‑evaluated when one of them
+            changes; an empty set means it is checked on every update.
     """
     id: str
     name: str
     description: str
     condition: Callable[["User"], bool]
+    depends_on: FrozenSet[str] = frozenset()
+
+
+class BadgeRegistry:
+    """An immutable, indexed set of badges.
+
+    Badges keep their registration order. Besides the id lookup, badges are
+    indexed by the user fields they depend on so that `affected_by` can
+    return just the ones worth re‑checking. Registries hold no game state
+    and may be shared by any number of Game instances.
+    """
+
+    def __init__(self, badges: Iterable[Badge]):
+        self._badges = tuple(badges)
+        lookup = {badge.id: badge for badge in self._badges}
+        if len(lookup) != len(self._badges):
+            raise ValueError("duplicate badge id in registry")
+        self.lookup: Mapping[str, Badge] = types.MappingProxyType(lookup)
+        self._order = {badge.id: i for i, badge in enumerate(self._badges)}
+        by_field: Dict[str, List[Badge]] = {}
+        for badge in self._badges:
+            for field in badge.depends_on or ("*",):
+                by_field.setdefault(field, []).append(badge)
+        self._by_field = {field: tuple(group) for field, group in by_field.items()}
+
+    def __iter__(self) -> Iterator[Badge]:
+        return iter(self._badges)
+
+    def __len__(self) -> int:
+        return len(self._badges)
+
+    def affected_by(self, changed: Optional[Iterable[str]]) -> Sequence[Badge]:
+        """Badges depending on any of the changed fields, in registration order.
+
+        Badges without declared dependencies are always included; None for
+        `changed` returns every badge.
+        """
+        if changed is None:
+            return self._badges
+        found: Dict[str, Badge] = {}
+        for field in itertools.chain(changed, ("*",)):
+            for badge in self._by_field.get(field, ()):
+                found[badge.id] = badge
+        return sorted(found.values(), key=lambda b: self._order[b.id])
+
+
+def _first_connection(user: "User") -> bool:
+    return user.points >= 5  # Enough points for one small task
+
+
+def _seven_day_streak(user: "User") -> bool:
+    return user.streak >= 7
+
+
+def _engaged_networker(user: "User") -> bool:
+    return user.level.name == "Engaged Networker"
+
+
+def _industry_insider(user: "User") -> bool:
+    return user.level.name == "Industry Insider"
+
+
+# Badges that do not depend on the game's module definitions
+CORE_BADGES: Tuple[Badge, ...] = (
+    Badge(
+        id="badge_first_connection",
+        name="First Connection",
+        description="Complete your first networking task.",
+        condition=_first_connection,
+        depends_on=frozenset({"points"}),
+    ),
+    Badge(
+        id="badge_7_day_streak",
+        name="Consistency Star",
+        description="Maintain a 7‑day streak of daily activity.",
+        condition=_seven_day_streak,
+        depends_on=frozenset({"streak"}),
+    ),
+    Badge(
+        id="badge_engaged",
+        name="Engaged Networker",
+        description="Reach the Engaged Networker level.",
+        condition=_engaged_networker,
+        depends_on=frozenset({"level"}),
+    ),
+    Badge(
+        id="badge_industry",
+        name="Industry Insider",
+        description="Achieve the highest level in the networking game.",
+        condition=_industry_insider,
+        depends_on=frozenset({"level"}),
+    ),
+)
+
+
+@functools.lru_cache(maxsize=256)
+def module_badge(module_name: str, mastery_threshold: int) -> Badge:
+    """Return the badge awarded for reaching mastery in a module."""
+    def mastered(user: "User") -> bool:
+        return user.module_points.get(module_name, 0) >= mastery_threshold
+    return Badge(
+        id=f"badge_module_{module_name.replace(' ', '_').lower()}",
+        name=f"{module_name} Master",
+        description=f"Achieve mastery in the {module_name} module.",
+        condition=mastered,
+        depends_on=frozenset({"module_points:" + module_name}),
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _badge_registry(module_specs: Tuple[Tuple[str, int], ...]) -> BadgeRegistry:
+    return BadgeRegistry(CORE_BADGES + tuple(module_badge(*spec) for spec in module_specs))
+
+
+def badge_registry_for(modules: Iterable[Module]) -> BadgeRegistry:
+    """Return the (cached) registry of core badges plus one per module."""
+    return _badge_registry(tuple((m.name, m.mastery_threshold) for m in modules))
+
+
+class _DefaultBadges:
+    """Read‑only stand‑in for the class‑level list Game.BADGES used to be.
+
+    On the class it returns the badges of a game with the default modules;
+    on an instance, that game's own badges. New code should use
+    ``game.badge_registry``.
+    """
+
+    def __get__(self, game: Optional["Game"], owner: type) -> Tuple[Badge, ...]:
+        return tuple((game if game is not None else Game()).badge_registry)
+
+    def __set__(self, game: "Game", value) -> None:
+        raise AttributeError("BADGES is read-only; use register_module() to add badges")
 
 
 @dataclasses.dataclass
@@ -187,6 +573,213 @@ class Level:
     max_points: Optional[int]
 
 
+class LevelTable:
+    """An immutable, precompiled table of levels ordered by threshold.
+
+    Levels must have strictly increasing `min_points` and must not overlap;
+    gaps are allowed (point totals that fall in one leave the level
+    unchanged). Only the last level may be open‑ended. Lookups bisect the
+    sorted thresholds, so resolving a level is O(log n) however many tiers
+    the table has.
+    """
+
+    def __init__(self, levels: Iterable[Level]):
+        self._levels: Tuple[Level, ...] = tuple(levels)
+        if not self._levels:
+            raise ValueError("a level table needs at least one level")
+        for lower, upper in zip(self._levels, self._levels[1:]):
+            if upper.min_points <= lower.min_points:
+                raise ValueError(f"level {upper.name!r} must start above {lower.name!r}")
+            if lower.max_points is None or lower.max_points >= upper.min_points:
+                raise ValueError(f"level {lower.name!r} overlaps {upper.name!r}")
+        for level in self._levels:
+            if level.max_points is not None and level.max_points < level.min_points:
+                raise ValueError(f"level {level.name!r} has max_points below min_points")
+        self._thresholds: Tuple[int, ...] = tuple(level.min_points for level in self._levels)
+        lookup = {level.name: level for level in self._levels}
+        if len(lookup) != len(self._levels):
+            raise ValueError("duplicate level name in table")
+        self.lookup: Mapping[str, Level] = types.MappingProxyType(lookup)
+
+    @classmethod
+    def from_thresholds(cls, tiers: Iterable[tuple]) -> "LevelTable":
+        """Build a contiguous table from ``(name, min_points)`` pairs.
+
+        Each level runs up to one point below the next level's threshold and
+        the last level is open‑ended.
+        """
+        tiers = sorted(tiers, key=lambda tier: tier[1])
+        levels = [
+            Level(name=name, min_points=low,
+                  max_points=tiers[i + 1][1] - 1 if i + 1 < len(tiers) else None)
+            for i, (name, low) in enumerate(tiers)
+        ]
+        return cls(levels)
+
+    def __iter__(self) -> Iterator[Level]:
+        return iter(self._levels)
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def __getitem__(self, index: int) -> Level:
+        return self._levels[index]
+
+    def contains(self, level: Level, points: int) -> bool:
+        """Return True if ``points`` lies within ``level``'s range."""
+        return level.min_points <= points and (level.max_points is None or points <= level.max_points)
+
+    def resolve(self, points: int) -> Optional[Level]:
+        """Return the level whose range contains ``points``, or None."""
+        i = bisect.bisect_right(self._thresholds, points) - 1
+        if i < 0:
+            return None
+        level = self._levels[i]
+        return level if self.contains(level, points) else None
+
+
+class _SkipNode:
+    """A node in the RankIndex skip list."""
+
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, height: int):
+        self.key = key
+        self.next: List[Optional["_SkipNode"]] = [None] * height
+        # Number of level‑0 steps from this node to ``next[level]``.
+        self.width: List[int] = [1] * height
+
+
+class RankIndex:
+    """An ordered set of leaderboard keys with positional access.
+
+    The index is an indexable skip list: every forward link records how many
+    entries it skips, which lets the structure answer both "what is the key
+    at position i" and "what position does this key occupy" in O(log n)
+    expected time. Insertions and removals are also O(log n), so the
+    leaderboard can be kept up to date as points change instead of being
+    re‑sorted for every request.
+
+    Keys must be unique and mutually comparable. The game uses
+    ``(-points, -streak, username)`` tuples, so ascending key order is
+    leaderboard order.
+    """
+
+    MAX_LEVELS = 32
+
+    def __init__(self):
+        self._head = _SkipNode(None, RankIndex.MAX_LEVELS)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def _random_height(self) -> int:
+        height = 1
+        while height < RankIndex.MAX_LEVELS and random.random() < 0.5:
+            height += 1
+        return height
+
+    def _find_predecessors(self, key):
+        """Return the rightmost node before ``key`` on every level, and the
+        level‑0 position of each of those nodes."""
+        chain: List[_SkipNode] = [self._head] * RankIndex.MAX_LEVELS
+        positions = [0] * RankIndex.MAX_LEVELS
+        node = self._head
+        pos = 0
+        for level in reversed(range(RankIndex.MAX_LEVELS)):
+            nxt = node.next[level]
+            while nxt is not None and nxt.key < key:
+                pos += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+            chain[level] = node
+            positions[level] = pos
+        return chain, positions
+
+    def insert(self, key) -> None:
+        """Add ``key`` to the index."""
+        chain, positions = self._find_predecessors(key)
+        height = self._random_height()
+        new = _SkipNode(key, height)
+        # Position (1‑based, head is 0) the new node will occupy on level 0.
+        new_pos = positions[0] + 1
+        for level in range(height):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - (new_pos - positions[level]) + 1
+            prev.width[level] = new_pos - positions[level]
+        for level in range(height, RankIndex.MAX_LEVELS):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key) -> None:
+        """Remove ``key`` from the index.
+
+        Raises:
+            KeyError: If the key is not present.
+        """
+        chain, _ = self._find_predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        height = len(node.next)
+        for level in range(height):
+            prev = chain[level]
+            prev.width[level] += node.width[level] - 1
+            prev.next[level] = node.next[level]
+        for level in range(height, RankIndex.MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def rank(self, key) -> int:
+        """Return the zero‑based position of ``key``.
+
+        Raises:
+            KeyError: If the key is not present.
+        """
+        node = self._head
+        pos = 0
+        for level in reversed(range(RankIndex.MAX_LEVELS)):
+            nxt = node.next[level]
+            while nxt is not None and nxt.key < key:
+                pos += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+        nxt = node.next[0]
+        if nxt is None or nxt.key != key:
+            raise KeyError(key)
+        return pos
+
+    def _node_at(self, index: int) -> Optional[_SkipNode]:
+        if index < 0 or index >= self._size:
+            return None
+        node = self._head
+        remaining = index + 1
+        for level in reversed(range(RankIndex.MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, index: int):
+        node = self._node_at(index)
+        if node is None:
+            raise IndexError("RankIndex index out of range")
+        return node.key
+
+    def iter_from(self, start: int):
+        """Yield keys in order beginning at position ``start``."""
+        node = self._node_at(max(0, start))
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
 class User:
     """Represents a player participating in the networking game.
 
@@ -196,16 +789,153 @@ class User:
     """
 
     def __init__(self, username: str):
+        # Callback invoked with (user, previous rank key) whenever points or
+        # streak change. The owning Game uses it to keep its RankIndex current.
+        self._rank_listener: Optional[Callable[["User", tuple], None]] = None
+        # Fields changed since badges were last evaluated (see
+        # take_badge_changes). None means "everything", so a new or freshly
+        # loaded user gets one full badge check.
+        self._badge_dirty: Optional[set] = None
         self.username: str = username
-        self.points: int = 0
-        self.level: Level = Game.LEVELS[0]
-        self.badges: List[Badge] = []
-        self.tasks: List[Task] = []
-        self.streak: int = 0
+        self._points: int = 0
+        self._streak: int = 0
+        self._level: Level = Game.LEVELS[0]
+        # Earned badges in award order, plus their ids for O(1) membership
+        self.badges = []
+        # Index of task ids to tasks, kept in sync with ``tasks`` so that
+        # completion and hint lookups do not need to scan the task list.
+        self._task_index: Dict[str, Task] = {}
+        self.tasks = []
         self.last_active: Optional[datetime.date] = None
         # Track progress towards each module's mastery. Keys are module names,
         # values are accumulated points within that module.
-        self.module_points: Dict[str, int] = {}
+        self.module_points = {}
+
+    @property
+    def points(self) -> int:
+        """Total experience points earned."""
+        return self._points
+
+    @points.setter
+    def points(self, value: int) -> None:
+        old_key = self.rank_key()
+        self._points = value
+        self._touch("points")
+        if self._rank_listener is not None:
+            self._rank_listener(self, old_key)
+
+    @property
+    def streak(self) -> int:
+        """Number of consecutive active days."""
+        return self._streak
+
+    @streak.setter
+    def streak(self, value: int) -> None:
+        old_key = self.rank_key()
+        self._streak = value
+        self._touch("streak")
+        if self._rank_listener is not None:
+            self._rank_listener(self, old_key)
+
+    @property
+    def level(self) -> Level:
+        """Current progression tier."""
+        return self._level
+
+    @level.setter
+    def level(self, value: Level) -> None:
+        self._level = value
+        self._touch("level")
+
+    @property
+    def module_points(self) -> Dict[str, int]:
+        """Accumulated points per module. Change entries with `set_module_points`."""
+        return self._module_points
+
+    @module_points.setter
+    def module_points(self, points: Dict[str, int]) -> None:
+        self._module_points: Dict[str, int] = points
+        # Cached mastered/unlocked sets, built on demand by Game
+        self.module_progress: Optional[ModuleProgress] = None
+
+    def set_module_points(self, module_name: str, value: int) -> None:
+        """Set the user's accumulated points in a module."""
+        old = self._module_points.get(module_name, 0)
+        self._module_points[module_name] = value
+        if self.module_progress is not None:
+            self.module_progress.update(module_name, old, value)
+        self._touch("module_points")
+        self._touch("module_points:" + module_name)
+
+    def _touch(self, field: str) -> None:
+        if self._badge_dirty is not None:
+            self._badge_dirty.add(field)
+
+    def take_badge_changes(self) -> Optional[set]:
+        """Return the fields changed since the last call and reset the set.
+
+        Returns None if every badge should be checked.
+        """
+        changed, self._badge_dirty = self._badge_dirty, set()
+        return changed
+
+    @property
+    def badges(self) -> List[Badge]:
+        """Earned badges, in the order they were awarded."""
+        return self._badges
+
+    @badges.setter
+    def badges(self, badges: List[Badge]) -> None:
+        self._badges: List[Badge] = list(badges)
+        self._badge_ids = {badge.id for badge in self._badges}
+
+    def add_badge(self, badge: Badge) -> None:
+        """Award a badge."""
+        self._badges.append(badge)
+        self._badge_ids.add(badge.id)
+
+    def has_badge(self, badge_id: str) -> bool:
+        """Return True if the badge with the given id has been earned."""
+        return badge_id in self._badge_ids
+
+    def reload_from(self, other: "User") -> None:
+        """Replace this user's progress with that of another instance.
+
+        Used to refresh a cached user from storage. Rank listeners are not
+        notified.
+        """
+        self._points = other._points
+        self._streak = other._streak
+        self._level = other._level
+        self.badges = other.badges
+        self.tasks = other.tasks
+        self.last_active = other.last_active
+        self.module_points = dict(other.module_points)
+
+    def rank_key(self) -> tuple:
+        """Return the key that orders this user on the leaderboard."""
+        return (-self._points, -self._streak, self.username)
+
+    @property
+    def tasks(self) -> List[Task]:
+        """The user's assigned tasks, in assignment order."""
+        return self._tasks
+
+    @tasks.setter
+    def tasks(self, tasks: List[Task]) -> None:
+        # Replacing the list (e.g. when pruning expired tasks) rebuilds the
+        # id index so the two never drift apart.
+        self._tasks: List[Task] = list(tasks)
+        self._task_index = {task.id: task for task in self._tasks}
+
+    def add_task(self, task: Task) -> None:
+        """Append a task to the user's list and index it by id."""
+        self._tasks.append(task)
+        self._task_index[task.id] = task
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """Return the task with the given id, or None if it is not assigned."""
+        return self._task_index.get(task_id)
 
     def to_dict(self) -> Dict:
         """Serialize the user to a JSON‑serializable dictionary."""
@@ -216,7 +946,7 @@ class User:
             "badges": [badge.id for badge in self.badges],
             "streak": self.streak,
             "last_active": self.last_active.isoformat() if self.last_active else None,
-            "tasks": [dataclasses.asdict(task) for task in self.tasks],
+            "tasks": [task.to_dict() for task in self.tasks],
             "module_points": self.module_points,
         }
 
@@ -241,34 +971,377 @@ class User:
         last_active_str = data.get("last_active")
         if last_active_str:
             user.last_active = datetime.date.fromisoformat(last_active_str)
-        # Reconstruct tasks
+        # Reconstruct tasks; add_task keeps the id index populated
         user.tasks = []
         for tdata in data.get("tasks", []):
-            task = Task(**{
-                "id": tdata["id"],
-                "description": tdata["description"],
-                "points": tdata["points"],
-                "category": tdata["category"],
-                "module_name": tdata.get("module_name"),
-                "hint": tdata.get("hint"),
-                "completed": tdata.get("completed", False),
-                "due_date": datetime.date.fromisoformat(tdata["due_date"]) if tdata.get("due_date") else None,
-                "hint_used": tdata.get("hint_used", False),
-            })
-            user.tasks.append(task)
+            user.add_task(Task.from_dict(tdata))
         # Restore module points
         user.module_points = data.get("module_points", {})
         return user
 
 
+class EventLog:
+    """An append‑only log of game mutations.
+
+    Each mutation is written as one compact JSON object per line, so the
+    cost of persisting a change is proportional to the change itself rather
+    than to the size of the whole game state. Every record carries an event
+    type under ``"e"`` and the affected username under ``"u"``; the remaining
+    fields depend on the event type (see `Game._apply_event`). The events
+    of one game operation are written as a single ``"group"`` record, so a
+    crash never leaves half an operation in the log.
+
+    Attributes:
+        filepath: Path of the log file. It is created if missing and always
+            opened for appending.
+        fsync: If True, force each record to stable storage before
+            returning. Slower, but survives power loss as well as crashes.
+    """
+
+    def __init__(self, filepath: str, fsync: bool = False):
+        self.filepath = filepath
+        self.fsync = fsync
+        # Number of records appended since the log was opened or rotated
+        self.pending: int = 0
+        self._lock = threading.Lock()
+        EventLog.truncate_torn_tail(filepath)
+        self._file = open(filepath, "a", encoding="utf-8")
+
+    @staticmethod
+    def truncate_torn_tail(filepath: str) -> None:
+        """Drop a partial last record left behind by a crash mid‑write.
+
+        Without this, the first record appended after a restart would be
+        glued onto the torn one and both would be unreadable.
+        """
+        try:
+            f = open(filepath, "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                if pos + step == end and chunk.endswith(b"\n"):
+                    return
+                cut = chunk.rfind(b"\n")
+                if cut >= 0:
+                    f.truncate(pos + cut + 1)
+                    return
+            f.truncate(0)
+
+    @staticmethod
+    def rotated_path(filepath: str) -> str:
+        """Return the path a log is moved to while it is being compacted."""
+        return filepath + ".1"
+
+    def append(self, event: Dict) -> None:
+        """Append a single event record and flush it to the file."""
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.pending += 1
+
+    def rotate(self) -> str:
+        """Move the current records aside and continue in an empty file.
+
+        If a rotated segment is still present from an interrupted
+        compaction, the current records are appended to it so no events are
+        lost.
+
+        Returns:
+            The path of the rotated segment.
+        """
+        rotated = EventLog.rotated_path(self.filepath)
+        with self._lock:
+            self._file.close()
+            if os.path.exists(rotated):
+                with open(self.filepath, "r", encoding="utf-8") as src, \
+                        open(rotated, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                os.remove(self.filepath)
+            else:
+                os.replace(self.filepath, rotated)
+            self._file = open(self.filepath, "a", encoding="utf-8")
+            self.pending = 0
+        return rotated
+
+    def close(self) -> None:
+        """Close the underlying file."""
+        with self._lock:
+            self._file.close()
+
+    @staticmethod
+    def read(filepath: str) -> Iterator[Dict]:
+        """Yield the events recorded in a log file, oldest first.
+
+        Malformed lines are skipped; they can only be records torn by a
+        crash in the middle of a write.
+        """
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+class Snapshotter:
+    """Periodically compacts a game's event log into a fresh snapshot.
+
+    A background thread calls `Game.compact` every `interval` seconds, or
+    sooner once `max_events` records have been logged since the last
+    snapshot. This keeps the log tail short, so loading costs roughly the
+    size of the snapshot no matter how long the game has been running.
+
+    Attributes:
+        game: The game whose state is snapshotted.
+        filepath: The snapshot path passed to `Game.compact`.
+        interval: Maximum number of seconds between snapshots.
+        max_events: Number of logged mutations that triggers an early
+            snapshot.
+    """
+
+    def __init__(self, game: "Game", filepath: str, interval: float = 60.0, max_events: int = 500):
+        self.game = game
+        self.filepath = filepath
+        self.interval = interval
+        self.max_events = max_events
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background thread and subscribe to the game's log."""
+        if self._thread is not None:
+            return
+        self.game.snapshotter = self
+        self._thread = threading.Thread(target=self._run, name="game-snapshotter", daemon=True)
+        self._thread.start()
+
+    def stop(self, final_snapshot: bool = True) -> None:
+        """Stop the background thread, optionally taking one last snapshot."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        if self.game.snapshotter is self:
+            self.game.snapshotter = None
+        if final_snapshot:
+            self.game.compact(self.filepath)
+
+    def notify(self, pending: int) -> None:
+        """Called by the game after each logged mutation."""
+        if pending >= self.max_events:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            event_log = self.game.event_log
+            if event_log is not None and event_log.pending == 0:
+                continue
+            try:
+                self.game.compact(self.filepath)
+            except OSError:
+                # Leave the log in place; the next round will retry.
+                continue
+
+
+class LazyUserMap(MutableMapping):
+    """A username → User mapping that loads users from storage on demand.
+
+    Only usernames are held for every player; full `User` objects are
+    hydrated from the storage backend on first access and kept in a
+    least‑recently‑used working set of at most `max_users` entries. Users
+    modified by the game are marked dirty and written back to storage when
+    they are evicted or when `flush` is called, so a hot user is persisted
+    once per eviction rather than once per mutation.
+
+    A user evicted while still referenced elsewhere (e.g. by a request in
+    progress) is remembered weakly, and a later lookup re‑admits that same
+    object instead of loading a second copy, so there is never more than one
+    live `User` per username. A mutation recorded against an evicted object
+    re‑admits it as well, so the change is not lost. Dirty users are written
+    back under their `user_lock`; one whose lock is held elsewhere is being
+    changed and stays cached until a later eviction pass. Usernames not seen
+    before are looked up in storage, so users created by other processes
+    sharing the backend are found too.
+
+    Attributes:
+        storage: The backend users are loaded from and flushed to.
+        max_users: Maximum number of hydrated users kept in memory.
+        write_behind: If False, the map never writes users back; the owner
+            is expected to persist every change itself.
+    """
+
+    def __init__(self, storage, level_lookup: Dict[str, Level], badge_lookup: Dict[str, Badge],
+                 max_users: int, on_hydrate: Optional[Callable[[User], None]] = None,
+                 write_behind: bool = True,
+                 user_lock: Optional[Callable[[str], threading.RLock]] = None):
+        self.storage = storage
+        self.max_users = max(1, max_users)
+        self.write_behind = write_behind
+        self._level_lookup = level_lookup
+        self._badge_lookup = badge_lookup
+        self._on_hydrate = on_hydrate
+        self._user_lock = user_lock
+        self._known = set(storage.usernames())
+        self._cache: "OrderedDict[str, User]" = OrderedDict()
+        # Evicted users that are still referenced somewhere
+        self._evicted: "weakref.WeakValueDictionary[str, User]" = weakref.WeakValueDictionary()
+        self._dirty: set = set()
+        self._lock = threading.RLock()
+
+    def __getitem__(self, username: str) -> User:
+        with self._lock:
+            user = self._cache.get(username)
+            if user is not None:
+                self._cache.move_to_end(username)
+                return user
+            user = self._evicted.pop(username, None)
+            if user is not None:
+                self._admit(user)
+                return user
+            user = self.storage.load_user(username, self._level_lookup, self._badge_lookup)
+            if user is None:
+                self._known.discard(username)
+                raise KeyError(username)
+            self._known.add(username)
+            if self._on_hydrate is not None:
+                self._on_hydrate(user)
+            self._admit(user)
+            return user
+
+    def __setitem__(self, username: str, user: User) -> None:
+        with self._lock:
+            self._known.add(username)
+            if self.write_behind:
+                self._dirty.add(username)
+            self._admit(user)
+
+    def __delitem__(self, username: str) -> None:
+        with self._lock:
+            self._known.remove(username)
+            self._cache.pop(username, None)
+            self._evicted.pop(username, None)
+            self._dirty.discard(username)
+
+    def __contains__(self, username: object) -> bool:
+        if username in self._known:
+            return True
+        try:
+            self[username]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._known))
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def cached(self) -> List[str]:
+        """Return the usernames currently hydrated, coldest first."""
+        with self._lock:
+            return list(self._cache)
+
+    def mark_dirty(self, user: User) -> None:
+        """Record that a user has changes that storage has not seen yet."""
+        with self._lock:
+            if self._cache.get(user.username) is not user:
+                self._evicted.pop(user.username, None)
+                self._admit(user)
+            self._dirty.add(user.username)
+
+    def flush(self) -> None:
+        """Write every dirty user back to storage."""
+        with self._lock:
+            dirty = [self._cache[name] for name in self._dirty if name in self._cache]
+            self._dirty.clear()
+        # Users are serialized under their own lock, taken without holding
+        # the map lock, which mutating threads need for mark_dirty()
+        for user in dirty:
+            try:
+                with self._lock_for(user.username):
+                    self.storage.save_user(user)
+            except BaseException:
+                with self._lock:
+                    self._dirty.add(user.username)
+                raise
+
+    def _lock_for(self, username: str):
+        if self._user_lock is None:
+            return contextlib.nullcontext()
+        return self._user_lock(username)
+
+    def _admit(self, user: User) -> None:
+        self._cache[user.username] = user
+        self._cache.move_to_end(user.username)
+        for username in list(self._cache):
+            if len(self._cache) <= self.max_users:
+                break
+            cold = self._cache[username]
+            if username in self._dirty:
+                # Never block on a user lock while holding the map lock
+                lock = self._user_lock(username) if self._user_lock is not None else None
+                if lock is not None and not lock.acquire(blocking=False):
+                    continue
+                try:
+                    self.storage.save_user(cold)
+                finally:
+                    if lock is not None:
+                        lock.release()
+                self._dirty.discard(username)
+            del self._cache[username]
+            self._evicted[username] = cold
+
+
+def _locks_user(method):
+    """Run a ``Game`` method that takes a user first under that user's lock."""
+    @functools.wraps(method)
+    def wrapper(self, user, *args, **kwargs):
+        with self._user_guard(user):
+            return method(self, user, *args, **kwargs)
+    return wrapper
+
+
 class Game:
     """Manages users, tasks, levels and badges for the networking game.
 
     This class stores the global definitions for levels and badges, and provides
     methods to register users, generate tasks, update progress and persist
     state.
+
+    Games are safe to share between threads. Every method that mutates a
+    user holds that user's re‑entrant lock (see `user_lock`), so operations
+    on the same user are atomic while unrelated users rarely contend. The
+    leaderboard index has its own lock, always taken after a user lock.
+
+    In shared mode (see `use_storage`) the storage backend is the single
+    source of truth for several processes: each user operation runs in a
+    storage transaction that first reloads the user, and leaderboard
+    queries are answered by the backend.
     """
 
+    # Number of striped per‑user locks; see user_lock()
+    USER_LOCK_STRIPES = 64
+
     # Define progression tiers. Adjust the thresholds and names as desired.
     LEVELS: List[Level] = [
         Level(name="Rookie Connector", min_points=0, max_points=20),
@@ -277,18 +1350,42 @@ class Game:
         Level(name="Industry Insider", min_points=81, max_points=None),
     ]
 
-    # Predefine badges. The conditions are specified as callables.
-    BADGES: List[Badge] = []  # This will be populated in __init__.
-
-    def __init__(self):
-        # Populate badge conditions. Many conditions reference game state, so
-        # they are defined lazily here rather than as class constants.
-        self.badge_lookup: Dict[str, Badge] = {}
-        self._register_badges()
-        # Lookup for quick level retrieval by name
-        self.level_lookup: Dict[str, Level] = {lvl.name: lvl for lvl in Game.LEVELS}
+    # Deprecated alias of the default badge registry, as a tuple
+    BADGES = _DefaultBadges()
+
+    def __init__(self, levels: Optional[Iterable[Level]] = None,
+                 task_ids: Optional[Callable[[str], str]] = None):
+        # Source of task ids: called with a category prefix ("d", "w" or
+        # "m"), returns a new unique id. See CounterIdGenerator and
+        # SnowflakeIdGenerator.
+        self.task_ids: Callable[[str], str] = task_ids or CounterIdGenerator()
+        # Progression tiers (Game.LEVELS unless a custom table is given),
+        # compiled for bisect lookups, and their lookup by name
+        self.levels: LevelTable = levels if isinstance(levels, LevelTable) else LevelTable(
+            Game.LEVELS if levels is None else levels)
+        self.level_lookup: Mapping[str, Level] = self.levels.lookup
         # In‑memory user registry
         self.users: Dict[str, User] = {}
+        # Leaderboard order, maintained incrementally as users change
+        self.ranking: RankIndex = RankIndex()
+        # Optional append‑only mutation log; see attach_event_log()
+        self.event_log: Optional[EventLog] = None
+        # Background compaction of the event log; see Snapshotter
+        self.snapshotter: Optional[Snapshotter] = None
+        # Optional row‑level storage backend; see use_storage()
+        self.storage = None
+        # Striped per‑user locks indexed by username hash, plus locks for
+        # the user registry and the ranking index
+        self._user_locks: Tuple[threading.RLock, ...] = tuple(
+            threading.RLock() for _ in range(self.USER_LOCK_STRIPES))
+        self._registry_lock = threading.Lock()
+        self._ranking_lock = threading.Lock()
+        # Serializes save() and compact() so snapshots never interleave
+        self._save_lock = threading.RLock()
+        # Events of the operation running on each thread; see _user_guard()
+        self._operation = threading.local()
+        # True when storage is shared with other processes; see use_storage()
+        self.shared = False
 
         # Predefined task templates. These represent categories of tasks that
         # will be instantiated fresh for each assignment.
@@ -307,8 +1404,9 @@ class Game:
         # Define learning modules inspired by Khan Academy. Each module groups
         # related tasks and specifies a mastery threshold. When a user
         # accumulates enough points in a module, it can be considered
-        # completed. Additional modules can be added here as the game grows.
-        self.modules: Dict[str, Module] = {
+        # completed. Additional modules can be added here as the game grows,
+        # or later with register_module(); ``modules`` is a read‑only view.
+        self._modules: Dict[str, Module] = {
             "Profile Optimization": Module(
                 name="Profile Optimization",
                 description="Craft a compelling LinkedIn profile that highlights your strengths and goals.",
@@ -366,78 +1464,39 @@ class Game:
             ),
         }
 
-        # After defining modules, create badges that mark module mastery. These
-        # badges are registered dynamically based on the modules defined
-        # above. This must happen after modules are set up so that
-        # badge conditions can reference the mastery thresholds.
-        self._register_module_badges()
-
-    def _register_badges(self) -> None:
-        """Define the available badges and their conditions."""
-        # Clear existing list in case of re‑initialization
-        Game.BADGES.clear()
-        # Badge for completing the first connection
-        def first_connection(user: User) -> bool:
-            return user.points >= 5  # Enough points for one small task
-        Game.BADGES.append(Badge(
-            id="badge_first_connection",
-            name="First Connection",
-            description="Complete your first networking task.",
-            condition=first_connection,
-        ))
-        # Badge for maintaining a 7‑day streak
-        def seven_day_streak(user: User) -> bool:
-            return user.streak >= 7
-        Game.BADGES.append(Badge(
-            id="badge_7_day_streak",
-            name="Consistency Star",
-            description="Maintain a 7‑day streak of daily activity.",
-            condition=seven_day_streak,
-        ))
-        # Badge for reaching the Engaged Networker level
-        def engaged_networker(user: User) -> bool:
-            return user.level.name == "Engaged Networker"
-        Game.BADGES.append(Badge(
-            id="badge_engaged",
-            name="Engaged Networker",
-            description="Reach the Engaged Networker level.",
-            condition=engaged_networker,
-        ))
-        # Badge for reaching Industry Insider level
-        def industry_insider(user: User) -> bool:
-            return user.level.name == "Industry Insider"
-        Game.BADGES.append(Badge(
-            id="badge_industry",
-            name="Industry Insider",
-            description="Achieve the highest level in the networking game.",
-            condition=industry_insider,
-        ))
-        # Populate lookup for quick retrieval
-        self.badge_lookup = {badge.id: badge for badge in Game.BADGES}
-
-    def _register_module_badges(self) -> None:
-        """Generate badges for completing each module.
-
-        For every defined module, create a badge that is awarded when the
-        user accumulates points equal to or exceeding the module's
-        mastery_threshold. These badges are added to the global BADGES list
-        and the badge lookup.
-        """
-        for module in self.modules.values():
-            badge_id = f"badge_module_{module.name.replace(' ', '_').lower()}"
-            badge_name = f"{module.name} Master"
-            badge_desc = f"Achieve mastery in the {module.name} module."
-            def condition_factory(mod: Module) -> Callable[[User], bool]:
-                return lambda user: user.module_points.get(mod.name, 0) >= mod.mastery_threshold
-            badge = Badge(
-                id=badge_id,
-                name=badge_name,
-                description=badge_desc,
-                condition=condition_factory(module),
-            )
-            Game.BADGES.append(badge)
-        # Refresh badge lookup now that module badges have been added
-        self.badge_lookup = {badge.id: badge for badge in Game.BADGES}
+        self.modules: Mapping[str, Module] = types.MappingProxyType(self._modules)
+        self._compile_modules(self._modules)
+
+    def _compile_modules(self, modules: Dict[str, Module]) -> None:
+        """Build the prerequisite DAG and badge registry for ``modules``.
+
+        Raises ValueError, leaving the game unchanged, if the modules form
+        a prerequisite cycle.
+        """
+        graph = ModuleGraph(modules)
+        # Badges: the core set plus one mastery badge per module. Games with
+        # the same modules share one precompiled, read‑only registry.
+        registry = badge_registry_for(modules.values())
+        self.module_graph: ModuleGraph = graph
+        self.badge_registry: BadgeRegistry = registry
+        self.badge_lookup: Mapping[str, Badge] = registry.lookup
+        if isinstance(getattr(self, "users", None), LazyUserMap):
+            self.users._badge_lookup = registry.lookup
+
+    def register_module(self, module: Module) -> None:
+        """Add a learning module, or replace the one with the same name.
+
+        The prerequisite DAG and badge registry are rebuilt; users' cached
+        module progress is recomputed on next use.
+
+        Raises:
+            ValueError: If the module would create a prerequisite cycle.
+        """
+        with self._registry_lock:
+            modules = dict(self._modules)
+            modules[module.name] = module
+            self._compile_modules(modules)
+            self._modules[module.name] = module
 
     def register_user(self, username: str) -> User:
         """Register a new user and return the user instance.
@@ -445,12 +1504,106 @@ class Game:
         If a user with the given username already exists, the existing user
         instance is returned. Usernames are treated case‑sensitively.
         """
-        if username in self.users:
-            return self.users[username]
-        user = User(username)
-        self.users[username] = user
+        with self._registry_lock:
+            if username in self.users:
+                return self.users[username]
+            user = User(username)
+            user.level = self.levels[0]
+            self.users[username] = user
+            self._track_rank(user)
+        self._log_event("register", user)
         return user
 
+    def user_lock(self, username: str) -> threading.RLock:
+        """Return the re‑entrant lock guarding a user's state.
+
+        Callers that need several game operations on one user to appear
+        atomic can hold this lock around them. Locks come from a fixed pool
+        of `USER_LOCK_STRIPES`, so memory stays bounded however many users
+        come and go; two users may share a lock, which is safe because no
+        operation holds more than one user lock at a time.
+        """
+        return self._user_locks[hash(username) % len(self._user_locks)]
+
+    @contextlib.contextmanager
+    def _user_guard(self, user: User):
+        """Run one user operation atomically.
+
+        Holds the user's lock and, when events are written straight to a
+        storage backend, a storage transaction (reloading the user first in
+        shared mode). Events logged by the operation are buffered and
+        appended to the event log as one record when it completes.
+        """
+        with self.user_lock(user.username):
+            op = self._operation
+            depth = getattr(op, "depth", 0)
+            if depth == 0:
+                op.events = []
+            op.depth = depth + 1
+            try:
+                if self._records_to_storage():
+                    with self.storage.transaction() as outermost:
+                        if outermost and self.shared:
+                            self._reload(user)
+                        yield
+                else:
+                    yield
+            finally:
+                op.depth = depth
+                if depth == 0:
+                    events, op.events = op.events, None
+            if depth == 0 and events and self.event_log is not None:
+                self._append_to_log(events[0] if len(events) == 1
+                                    else {"e": "group", "u": user.username, "events": events})
+
+    def _records_to_storage(self) -> bool:
+        """True if mutations are written to the storage backend as they happen."""
+        return self.storage is not None and (self.shared or not isinstance(self.users, LazyUserMap))
+
+    def _reload(self, user: User) -> None:
+        fresh = self.storage.load_user(user.username, self.level_lookup, self.badge_lookup)
+        if fresh is not None:
+            user.reload_from(fresh)
+
+    def refresh(self, user: User) -> None:
+        """Bring a user up to date with changes made by other processes.
+
+        Only needed in shared mode before reading a user's state; game
+        operations refresh the user themselves.
+        """
+        if self.shared:
+            with self._user_guard(user):
+                pass
+
+    def _track_rank(self, user: User) -> None:
+        """Add a user to the ranking and subscribe to their rank changes."""
+        if not self.shared:
+            with self._ranking_lock:
+                self.ranking.insert(user.rank_key())
+        self._attach_user(user)
+
+    def _attach_user(self, user: User) -> None:
+        """Subscribe to rank changes of a user already in the ranking."""
+        user._rank_listener = self._on_rank_change
+
+    def _on_rank_change(self, user: User, old_key: tuple) -> None:
+        """Move a user within the ranking after points or streak change."""
+        new_key = user.rank_key()
+        if new_key != old_key:
+            if not self.shared:
+                with self._ranking_lock:
+                    self.ranking.remove(old_key)
+                    self.ranking.insert(new_key)
+            self._log_event("stats", user, p=user.points, s=user.streak)
+
+    def _prune_expired(self, user: User, today: datetime.date) -> None:
+        """Drop the user's overdue tasks."""
+        expired = [t.id for t in user.tasks if t.is_overdue(today)]
+        if expired:
+            user.tasks = [t for t in user.tasks if not t.is_overdue(today)]
+            self._log_event("expire", user, ids=expired)
+
+    @_locks_user
     def assign_daily_tasks(self, user: User, num_tasks: int = 2) -> None:
         """Assign daily tasks to the user.
 
@@ -464,13 +1617,13 @@ class Game:
         """
         today = datetime.date.today()
         # Remove expired tasks
-        user.tasks = [t for t in user.tasks if not t.is_overdue(today)]
+        self._prune_expired(user, today)
         # Count how many daily tasks are still pending
         pending_daily = [t for t in user.tasks if t.category == "daily"]
         # Assign new tasks until the desired number is reached
         while len(pending_daily) < num_tasks:
             template = random.choice(self.daily_task_templates)
-            task_id = f"d{int(datetime.datetime.now().timestamp() * 1000)}{random.randint(0, 999)}"
+            task_id = self.task_ids("d")
             due = today  # daily tasks are due by end of day
             new_task = Task(
                 id=task_id,
@@ -479,9 +1632,11 @@ class Game:
                 category="daily",
                 due_date=due,
             )
-            user.tasks.append(new_task)
+            user.add_task(new_task)
+            self._log_event("assign", user, task=new_task.to_dict())
             pending_daily.append(new_task)
 
+    @_locks_user
     def assign_weekly_tasks(self, user: User, num_tasks: int = 1) -> None:
         """Assign weekly tasks to the user.
 
@@ -494,12 +1649,12 @@ class Game:
         # Compute end of the current week (Sunday)
         end_of_week = today + datetime.timedelta(days=(7 - dow))
         # Remove expired tasks
-        user.tasks = [t for t in user.tasks if not t.is_overdue(today)]
+        self._prune_expired(user, today)
         # Count existing weekly tasks
         pending_weekly = [t for t in user.tasks if t.category == "weekly"]
         while len(pending_weekly) < num_tasks:
             template = random.choice(self.weekly_task_templates)
-            task_id = f"w{int(datetime.datetime.now().timestamp() * 1000)}{random.randint(0, 999)}"
+            task_id = self.task_ids("w")
             new_task = Task(
                 id=task_id,
                 description=template["description"],
@@ -507,9 +1662,11 @@ class Game:
                 category="weekly",
                 due_date=end_of_week,
             )
-            user.tasks.append(new_task)
+            user.add_task(new_task)
+            self._log_event("assign", user, task=new_task.to_dict())
             pending_weekly.append(new_task)
 
+    @_locks_user
     def assign_module_tasks(self, user: User, module_name: str, num_tasks: int = 2) -> None:
         """Assign tasks from a specified module to the user.
 
@@ -527,26 +1684,20 @@ class Game:
         module = self.modules.get(module_name)
         if not module:
             raise ValueError(f"Unknown module: {module_name}")
-        # Check prerequisites: user must have mastered all prerequisites
-        for prereq in module.prerequisites:
-            prereq_points = user.module_points.get(prereq, 0)
-            prereq_mod = self.modules.get(prereq)
-            # If prerequisite module definition missing, treat as incomplete
-            if not prereq_mod or prereq_points < prereq_mod.mastery_threshold:
-                # Do not assign tasks if prerequisites not met
-                return
-        # Check if module already mastered
-        current_points = user.module_points.get(module_name, 0)
-        if current_points >= module.mastery_threshold:
+        progress = self.module_progress(user)
+        # Do not assign tasks if prerequisites are not met
+        if module_name not in progress.unlocked:
+            return
+        if module_name in progress.mastered:
             return  # Already completed
         # Remove expired tasks and retain incomplete ones
         today = datetime.date.today()
-        user.tasks = [t for t in user.tasks if not t.is_overdue(today)]
+        self._prune_expired(user, today)
         # Find existing module tasks
         pending_module = [t for t in user.tasks if t.category == "module" and t.module_name == module_name]
         while len(pending_module) < num_tasks:
             template = random.choice(module.task_templates)
-            task_id = f"m{int(datetime.datetime.now().timestamp() * 1000)}{random.randint(0, 999)}"
+            task_id = self.task_ids("m")
             new_task = Task(
                 id=task_id,
                 description=template["description"],
@@ -556,7 +1707,8 @@ class Game:
                 hint=template.get("hint"),
                 due_date=None,
             )
-            user.tasks.append(new_task)
+            user.add_task(new_task)
+            self._log_event("assign", user, task=new_task.to_dict())
             pending_module.append(new_task)
 
     def get_module_progress(self, user: User) -> Dict[str, float]:
@@ -580,34 +1732,36 @@ class Game:
             progress[name] = min(1.0, fraction)
         return progress
 
+    def module_progress(self, user: User) -> ModuleProgress:
+        """Return the user's cached mastered/unlocked module sets.
+
+        The sets are built from the user's module points on first use and
+        then updated incrementally by `User.set_module_points`.
+        """
+        progress = user.module_progress
+        if progress is None or progress.graph is not self.module_graph:
+            progress = ModuleProgress(self.module_graph, user.module_points)
+            user.module_progress = progress
+        return progress
+
+    @_locks_user
     def get_available_modules(self, user: User) -> List[str]:
         """Return a list of module names that the user can currently access.
 
         A module is available if the user has mastered all of its
-        prerequisites. Modules with no prerequisites are always available.
+        prerequisites. Modules with no prerequisites are always available,
+        and mastered modules stay available so users can revisit tasks.
 
         Args:
             user: The user whose available modules are being queried.
 
         Returns:
-            A list of module names sorted in arbitrary order.
+            A list of module names in the order the modules were defined.
         """
-        available: List[str] = []
-        for name, module in self.modules.items():
-            # Check if module is already mastered; still include so user can revisit tasks
-            prerequisites_met = True
-            for prereq in module.prerequisites:
-                prereq_mod = self.modules.get(prereq)
-                if not prereq_mod:
-                    prerequisites_met = False
-                    break
-                if user.module_points.get(prereq, 0) < prereq_mod.mastery_threshold:
-                    prerequisites_met = False
-                    break
-            if prerequisites_met:
-                available.append(name)
-        return available
+        unlocked = self.module_progress(user).unlocked
+        return sorted(unlocked, key=self.module_graph.index.__getitem__)
 
+    @_locks_user
     def use_task_hint(self, user: User, task_id: str) -> Optional[str]:
         """Reveal the hint for a given task and mark it as used.
 
@@ -622,11 +1776,15 @@ class Game:
         Returns:
             The hint text if available; otherwise None.
         """
-        for task in user.tasks:
-            if task.id == task_id and not task.completed:
-                return task.use_hint()
+        task = user.get_task(task_id)
+        if task is not None and not task.completed:
+            hint = task.use_hint()
+            if hint is not None:
+                self._log_event("hint", user, t=task_id)
+            return hint
         return None
 
+    @_locks_user
     def complete_task(self, user: User, task_id: str) -> bool:
         """Mark a task as completed and update user progress.
 
@@ -639,49 +1797,71 @@ class Game:
         """
         today = datetime.date.today()
         # Find the task
-        for task in user.tasks:
-            if task.id == task_id and not task.completed:
-                # Mark completed and award points
-                task.completed = True
-                # Award full points regardless of hint usage. Hints
-                # provide guidance but do not reduce the points earned.
-                awarded = task.points
-                user.points += awarded
-                # If this task belongs to a module, accumulate full module points
-                if task.category == "module" and task.module_name:
-                    current = user.module_points.get(task.module_name, 0)
-                    user.module_points[task.module_name] = current + awarded
-                # Update streak: increment if last active was yesterday or today
-                if user.last_active is None or (today - user.last_active).days <= 1:
-                    user.streak += 1
-                else:
-                    user.streak = 1
-                user.last_active = today
-                # Update level and badges
-                self._update_level(user)
-                self._update_badges(user)
-                return True
-        return False
+        task = user.get_task(task_id)
+        if task is None or task.completed:
+            return False
+        # Mark completed and award points
+        task.completed = True
+        # Award full points regardless of hint usage. Hints
+        # provide guidance but do not reduce the points earned.
+        awarded = task.points
+        user.points += awarded
+        # If this task belongs to a module, accumulate full module points
+        module_update = None
+        if task.category == "module" and task.module_name:
+            current = user.module_points.get(task.module_name, 0)
+            user.set_module_points(task.module_name, current + awarded)
+            module_update = {task.module_name: current + awarded}
+        # Update streak: increment if last active was yesterday or today
+        if user.last_active is None or (today - user.last_active).days <= 1:
+            user.streak += 1
+        else:
+            user.streak = 1
+        user.last_active = today
+        self._log_event("complete", user, t=task_id, d=today.isoformat(), m=module_update)
+        # Update level and badges
+        self._update_level(user)
+        self._update_badges(user)
+        return True
+
+    @_locks_user
+    def add_points(self, user: User, points: int) -> None:
+        """Award bonus points outside of task completion (e.g. quest scores).
+
+        Negative amounts are ignored. The user's level and badges are
+        updated to reflect the new total.
+        """
+        user.points += int(max(0, points))
+        self._update_level(user)
+        self._update_badges(user)
 
+    @_locks_user
     def _update_level(self, user: User) -> None:
         """Update the user's level based on current point totals."""
-        # Find the highest level that meets the user's point total
-        for level in reversed(Game.LEVELS):
-            if level.max_points is None:
-                # Open‑ended highest level
-                if user.points >= level.min_points:
-                    user.level = level
-                    return
-            else:
-                if level.min_points <= user.points <= level.max_points:
-                    user.level = level
-                    return
-
+        # Most updates leave the user inside their current level's range
+        current = user.level
+        if self.level_lookup.get(current.name) is current and self.levels.contains(current, user.points):
+            return
+        level = self.levels.resolve(user.points)
+        if level is not None:
+            self._set_level(user, level)
+
+    def _set_level(self, user: User, level: Level) -> None:
+        if user.level is not level:
+            user.level = level
+            self._log_event("level", user, l=level.name)
+
+    @_locks_user
     def _update_badges(self, user: User) -> None:
-        """Check for new badges and award them as appropriate."""
-        for badge in Game.BADGES:
-            if badge not in user.badges and badge.condition(user):
-                user.badges.append(badge)
+        """Check for new badges and award them as appropriate.
+
+        Only badges that depend on a field changed since the last check are
+        evaluated, in registration order.
+        """
+        for badge in self.badge_registry.affected_by(user.take_badge_changes()):
+            if not user.has_badge(badge.id) and badge.condition(user):
+                user.add_badge(badge)
+                self._log_event("badge", user, b=badge.id)
 
     def get_leaderboard(self, top_n: int = 10) -> List[Dict[str, object]]:
         """Return a sorted leaderboard of users based on points and streaks.
@@ -689,37 +1869,285 @@ class Game:
         Users are ranked primarily by points, then by streak length, and then
         alphabetically by username for deterministic ordering. Only the top
         `top_n` entries are returned by default.
+
+        Entries are read in order from the incrementally maintained
+        ranking, so the cost is proportional to `top_n` rather than the
+        number of registered users.
         """
-        sorted_users = sorted(
-            self.users.values(),
-            key=lambda u: (-u.points, -u.streak, u.username),
-        )
-        leaderboard = []
-        for user in sorted_users[:top_n]:
-            leaderboard.append({
-                "username": user.username,
-                "points": user.points,
-                "level": user.level.name,
-                "streak": user.streak,
-                "badges": [b.name for b in user.badges],
-            })
-        return leaderboard
+        if self.shared:
+            return [self._leaderboard_entry(self._fresh_user(name))
+                    for name in self.storage.top_usernames(top_n)]
+        with self._ranking_lock:
+            keys = list(itertools.islice(self.ranking, top_n))
+        return [self._leaderboard_entry(self.users[key[2]]) for key in keys]
 
-    def save(self, filepath: str) -> None:
-        """Serialize the game state to a JSON file."""
-        data = {
-            "users": {username: user.to_dict() for username, user in self.users.items()},
-            "timestamp": datetime.datetime.now().isoformat(),
+    def get_rank(self, username: str, window: int = 2) -> Dict[str, object]:
+        """Return a user's leaderboard position and their nearest neighbours.
+
+        The rank is resolved from the ranking index in logarithmic time, and
+        only the `window` entries directly above and below the user are
+        materialized.
+
+        Args:
+            username: The user whose position is requested.
+            window: How many neighbours to include on each side.
+
+        Returns:
+            A dictionary with the user's 1‑based `rank`, the `total` number
+            of ranked users, the user's own leaderboard `entry`, and `above`
+            and `below` lists of neighbouring entries. Every entry carries its
+            own `rank`.
+        """
+        user = self.users.get(username)
+        if user is None:
+            raise ValueError(f"Unknown user: {username}")
+        if self.shared:
+            index, total, names = self.storage.rank_window(username, window)
+            start = max(0, index - window)
+            users = [self._fresh_user(name) for name in names]
+        else:
+            with self.user_lock(username), self._ranking_lock:
+                index = self.ranking.rank(user.rank_key())
+                total = len(self.ranking)
+                start = max(0, index - window)
+                keys = list(itertools.islice(self.ranking.iter_from(start), index - start + window + 1))
+            users = [self.users[key[2]] for key in keys]
+        rows = []
+        for offset, ranked in enumerate(users):
+            rows.append({"rank": start + offset + 1, **self._leaderboard_entry(ranked)})
+        split = index - start
+        return {
+            "rank": index + 1,
+            "total": total,
+            "entry": rows[split],
+            "above": rows[:split],
+            "below": rows[split + 1:],
         }
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
 
-    def load(self, filepath: str) -> None:
-        """Load game state from a JSON file, replacing any existing users."""
+    def _fresh_user(self, username: str) -> User:
+        """Return a user as currently stored, bypassing any cached copy."""
+        return self.storage.load_user(username, self.level_lookup, self.badge_lookup)
+
+    def _leaderboard_entry(self, user: User) -> Dict[str, object]:
+        """Return the public leaderboard fields for a user."""
+        return {
+            "username": user.username,
+            "points": user.points,
+            "level": user.level.name,
+            "streak": user.streak,
+            "badges": [b.name for b in user.badges],
+        }
+
+    def save(self, filepath: str) -> None:
+        """Serialize the game state to a JSON file.
+
+        The file is a full snapshot. When an event log is attached, events
+        appended after the snapshot are replayed on top of it by `load`.
+        The snapshot is written to a fresh temporary file next to
+        `filepath` and then renamed over it, so a crash never leaves a
+        partially written file. Concurrent saves are serialized.
+        """
+        with self._save_lock:
+            users = {}
+            for username in list(self.users):
+                with self.user_lock(username):
+                    users[username] = self.users[username].to_dict()
+            data = {
+                "users": users,
+                "timestamp": datetime.datetime.now().isoformat(),
+            }
+            try:
+                mode = stat.S_IMODE(os.stat(filepath).st_mode)
+            except FileNotFoundError:
+                mode = 0o644
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or ".",
+                                            prefix=os.path.basename(filepath) + ".", suffix=".tmp")
+            try:
+                # mkstemp creates the file private; keep the snapshot's own mode
+                os.chmod(tmp_path, mode)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=4)
+                os.replace(tmp_path, filepath)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                raise
+
+    def compact(self, filepath: str) -> None:
+        """Write a fresh snapshot and discard the events it supersedes.
+
+        The attached log is rotated before the snapshot is taken, so events
+        logged while the snapshot is being written land in the new log and
+        are replayed on top of it. The rotated segment is deleted only once
+        the snapshot has been safely renamed into place.
+        """
+        with self._save_lock:
+            if self.event_log is None:
+                self.save(filepath)
+                return
+            rotated = self.event_log.rotate()
+            self.save(filepath)
+            os.remove(rotated)
+
+    def load(self, filepath: str, log_path: Optional[str] = None) -> None:
+        """Load game state from a JSON file, replacing any existing users.
+
+        Args:
+            filepath: The snapshot written by `save`.
+            log_path: Optional event log to replay on top of the snapshot
+                (see `replay_log`). A missing log file is treated as empty.
+        """
         with open(filepath, "r", encoding="utf-8") as f:
             data = json.load(f)
         users_data = data.get("users", {})
+        self._replace_users(
+            User.from_dict(udata, level_lookup=self.level_lookup, badge_lookup=self.badge_lookup)
+            for udata in users_data.values()
+        )
+        if log_path:
+            self.replay_log(log_path)
+
+    def _replace_users(self, users: Iterable[User]) -> None:
+        """Swap in a new set of users and rebuild the ranking for them."""
+        # Users from before the load no longer belong to this game's ranking
+        previous = self.users.cached() if isinstance(self.users, LazyUserMap) else self.users
+        for username in previous:
+            self.users[username]._rank_listener = None
         self.users = {}
-        for username, udata in users_data.items():
-            user = User.from_dict(udata, level_lookup=self.level_lookup, badge_lookup=self.badge_lookup)
-            self.users[username] = user
+        self.ranking = RankIndex()
+        for user in users:
+            self.users[user.username] = user
+            self._track_rank(user)
+
+    def use_storage(self, storage, max_cached_users: Optional[int] = None, shared: bool = False) -> None:
+        """Load users from a storage backend and keep it up to date.
+
+        By default every user is loaded immediately and each mutation is
+        forwarded to `storage`, which persists only the rows it touches.
+
+        If `max_cached_users` is given, users are instead loaded lazily
+        through a `LazyUserMap` holding at most that many users in memory.
+        The leaderboard is seeded from the backend's rank keys without
+        hydrating anyone, and modified users are written back when they are
+        evicted or when `flush` is called.
+
+        If `shared` is True, the backend is treated as the authoritative
+        state of several processes (e.g. gunicorn workers) using it at
+        once. Users are loaded lazily, every user operation reloads the
+        user and writes through inside one storage transaction, and the
+        leaderboard is queried from storage instead of an in‑memory index.
+
+        See `game_storage` for the backend interface and the SQLite
+        implementation.
+        """
+        self.shared = shared
+        if shared:
+            self._replace_users([])
+            self.users = LazyUserMap(storage, self.level_lookup, self.badge_lookup,
+                                     max_cached_users or 1024, on_hydrate=self._attach_user,
+                                     write_behind=False)
+        elif max_cached_users is None:
+            self._replace_users(storage.load_users(self.level_lookup, self.badge_lookup))
+        else:
+            self._replace_users([])
+            for username, points, streak in storage.rank_keys():
+                self.ranking.insert((-points, -streak, username))
+            self.users = LazyUserMap(storage, self.level_lookup, self.badge_lookup, max_cached_users,
+                                     on_hydrate=self._attach_user, user_lock=self.user_lock)
+        self.storage = storage
+
+    def flush(self) -> None:
+        """Write users with pending changes back to a lazy storage backend."""
+        if isinstance(self.users, LazyUserMap):
+            self.users.flush()
+
+    def attach_event_log(self, filepath: str, fsync: bool = False) -> None:
+        """Start appending every subsequent mutation to an event log.
+
+        Any previously attached log is closed first.
+        """
+        self.detach_event_log()
+        self.event_log = EventLog(filepath, fsync=fsync)
+
+    def detach_event_log(self) -> None:
+        """Stop logging mutations and close the current event log, if any."""
+        if self.event_log is not None:
+            self.event_log.close()
+            self.event_log = None
+
+    def replay_log(self, filepath: str) -> None:
+        """Apply the events recorded in a log file to the current state.
+
+        A segment left behind by an interrupted `compact` is replayed first.
+        Missing files are skipped. Events carry resulting values rather than
+        increments, so replaying a log over a snapshot that already includes
+        some of its events still converges to the logged end state.
+        """
+        event_log, self.event_log = self.event_log, None
+        storage, self.storage = self.storage, None
+        try:
+            for path in (EventLog.rotated_path(filepath), filepath):
+                if not os.path.exists(path):
+                    continue
+                for event in EventLog.read(path):
+                    self._apply_event(event)
+        finally:
+            self.event_log = event_log
+            self.storage = storage
+
+    def _log_event(self, kind: str, user: User, **fields) -> None:
+        """Record a mutation in the event log and storage backend, if any."""
+        if self.event_log is None and self.storage is None:
+            return
+        event = {"e": kind, "u": user.username, **fields}
+        if self.event_log is not None:
+            pending = getattr(self._operation, "events", None)
+            if pending is not None:
+                pending.append(event)
+            else:
+                self._append_to_log(event)
+        if self.storage is not None:
+            if self._records_to_storage():
+                self.storage.record(event)
+            else:
+                self.users.mark_dirty(user)
+
+    def _append_to_log(self, event: Dict) -> None:
+        self.event_log.append(event)
+        if self.snapshotter is not None:
+            self.snapshotter.notify(self.event_log.pending)
+
+    def _apply_event(self, event: Dict) -> None:
+        """Apply one event record produced by `_log_event`."""
+        kind = event["e"]
+        if kind == "group":
+            for member in event["events"]:
+                self._apply_event(member)
+            return
+        user = self.register_user(event["u"])
+        if kind == "stats":
+            user.points = event["p"]
+            user.streak = event["s"]
+        elif kind == "assign":
+            if user.get_task(event["task"]["id"]) is None:
+                user.add_task(Task.from_dict(event["task"]))
+        elif kind == "expire":
+            expired = set(event["ids"])
+            user.tasks = [t for t in user.tasks if t.id not in expired]
+        elif kind == "complete":
+            task = user.get_task(event["t"])
+            if task is not None:
+                task.completed = True
+            user.last_active = datetime.date.fromisoformat(event["d"])
+            for name, value in (event.get("m") or {}).items():
+                user.set_module_points(name, value)
+        elif kind == "hint":
+            task = user.get_task(event["t"])
+            if task is not None:
+                task.hint_used = True
+        elif kind == "level":
+            user.level = self.level_lookup[event["l"]]
+        elif kind == "badge":
+            badge = self.badge_lookup[event["b"]]
+            if not user.has_badge(badge.id):
+                user.add_badge(badge)
@@ -1,38 +1,200 @@
 # ngameapp.py — minimal, Mongo-free game server with optional Snowflake integration
-from flask import Flask, request, jsonify, render_template
-from networking_game import Game, User
-from snowflake_client import sf_complete  # <-- FIX 1: correct import
-import os, json
+from flask import Flask, Response, request, jsonify, render_template, g, session, stream_with_context
+from networking_game import Game, Snapshotter, User
+from game_storage import SQLiteStorage
+from heuristics import heuristic_score  # local fallback scoring
+from snowflake_client import sf_complete, sf_complete_stream, breaker  # <-- FIX 1: correct import
+import os, re, json, time, atexit, secrets, datetime, tempfile, threading
+from collections import deque, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import fcntl  # optional: guards per-process stores (not available on Windows)
+except ImportError:
+    fcntl = None
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
-# --- Game bootstrap (in-memory) ---
-game = Game()
-CURRENT_USER = "Player-001"                  # anonymized demo user
-user = game.register_user(CURRENT_USER)
-game.assign_daily_tasks(user, num_tasks=2)
-game.assign_weekly_tasks(user, num_tasks=1)
-
-# --- Helpers ---
-def add_points(u: User, pts: int):
-    u.points += int(max(0, pts))
-    game._update_level(u)
+# Signs the session cookie that identifies each player. Set GAME_SECRET_KEY
+# in production; otherwise a key is generated once and kept in SECRET_PATH
+# so that every worker on the host (and every restart) shares it.
+SECRET_PATH = os.environ.get("GAME_SECRET_PATH", ".secret_key")
+
+def load_secret_key():
+    key = os.environ.get("GAME_SECRET_KEY")
+    if key:
+        return key
+    if not os.path.exists(SECRET_PATH):
+        # Write the key in full before linking it into place, so a worker
+        # that loses the race never reads a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SECRET_PATH) or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(secrets.token_hex(32))
+            try:
+                os.link(tmp_path, SECRET_PATH)
+            except FileExistsError:
+                pass  # another worker's key won
+        finally:
+            os.remove(tmp_path)
+    with open(SECRET_PATH, encoding="utf-8") as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"{SECRET_PATH} is empty; delete it or set GAME_SECRET_KEY")
+    return key
+
+app.secret_key = load_secret_key()
+app.permanent_session_lifetime = datetime.timedelta(days=365)
+app.config.update(SESSION_COOKIE_HTTPONLY=True, SESSION_COOKIE_SAMESITE="Lax")
 
 # --- Minimal persistence to file (optional) ---
+# "log" appends each mutation to LOG_PATH and replays it over SAVE_PATH on
+# boot; "snapshot" rewrites SAVE_PATH after every change; "sqlite" writes
+# only the touched rows to DB_PATH (importing SAVE_PATH on first run).
+PERSISTENCE = os.environ.get("GAME_PERSISTENCE", "log")
 SAVE_PATH = "save.json"
+LOG_PATH = "save.log"
+DB_PATH = os.environ.get("GAME_DB_PATH", "game.db")
+# In sqlite mode, keep at most this many players in memory (unset = all)
+CACHE_USERS = int(os.environ["GAME_CACHE_USERS"]) if os.environ.get("GAME_CACHE_USERS") else None
+# In sqlite mode, treat DB_PATH as shared by all gunicorn workers (e.g.
+# `gunicorn -w 4 ngameapp:app`): every request reads and writes through it.
+# This is the only mode that is safe with more than one worker; the others
+# keep the game in one process's memory, so load_all locks their files and
+# refuses to start a second process on them.
+SHARED_STORE = os.environ.get("GAME_SHARED_STORE", "") in ("1", "true", "yes")
+# In log mode, fold the log into a fresh snapshot this often (seconds) or
+# after this many logged mutations, whichever comes first.
+SNAPSHOT_INTERVAL = float(os.environ.get("GAME_SNAPSHOT_INTERVAL", "60"))
+SNAPSHOT_EVERY = int(os.environ.get("GAME_SNAPSHOT_EVERY", "500"))
+
+game = Game()
+
+# Lock on the files of a per-process store, held for the life of the process
+_store_lock = None
+
+def claim_store(path: str):
+    """Lock `path` for this process, or raise if another process already has."""
+    if fcntl is None or path == ":memory:":
+        return None
+    f = open(path + ".lock", "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        raise RuntimeError(
+            f"{path} is in use by another process. GAME_PERSISTENCE={PERSISTENCE} keeps the "
+            f"game in one process; with several workers set GAME_PERSISTENCE=sqlite and "
+            f"GAME_SHARED_STORE=1") from None
+    return f
 
 def save_all():
+    if PERSISTENCE in ("log", "sqlite"):
+        return  # mutations were already written as they happened
     try:
         game.save(SAVE_PATH)
     except Exception:
         pass
 
 def load_all():
+    global _store_lock
+    if not (PERSISTENCE == "sqlite" and SHARED_STORE):
+        _store_lock = claim_store(DB_PATH if PERSISTENCE == "sqlite" else SAVE_PATH)
+    if PERSISTENCE == "sqlite":
+        storage = SQLiteStorage(DB_PATH)
+        if not storage.usernames() and os.path.exists(SAVE_PATH):
+            try:
+                game.load(SAVE_PATH)
+                storage.save_users(game.users.values())
+            except Exception:
+                pass
+        game.use_storage(storage, max_cached_users=CACHE_USERS, shared=SHARED_STORE)
+        atexit.register(game.flush)
+        return
     try:
         if os.path.exists(SAVE_PATH):
-            game.load(SAVE_PATH)
+            game.load(SAVE_PATH, log_path=LOG_PATH if PERSISTENCE == "log" else None)
+        elif PERSISTENCE == "log":
+            game.replay_log(LOG_PATH)
     except Exception:
         pass
+    if PERSISTENCE == "log":
+        game.attach_event_log(LOG_PATH)
+        snapshotter = Snapshotter(game, SAVE_PATH, interval=SNAPSHOT_INTERVAL, max_events=SNAPSHOT_EVERY)
+        snapshotter.start()
+        atexit.register(snapshotter.stop)
+
+# --- Game bootstrap ---
+# `python ngameapp.py` starts the debug reloader, whose first process only
+# watches files and re-runs this module in a child that serves requests;
+# only that child loads (and locks) the store.
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    load_all()
+
+# --- Players: resolved per request from the signed session ---
+# The username lives in Flask's signed session cookie, so a client cannot
+# claim another player's name (names are public on the leaderboard). The
+# plain X-Player header is only honoured with GAME_TRUST_PLAYER_HEADER set,
+# e.g. behind a proxy that authenticates players itself.
+PLAYER_HEADER = "X-Player"
+PLAYER_SESSION_KEY = "player"
+TRUST_PLAYER_HEADER = os.environ.get("GAME_TRUST_PLAYER_HEADER", "") in ("1", "true", "yes")
+_PLAYER_RE = re.compile(r"^[A-Za-z0-9_-]{1,40}$")
+
+def new_player_name():
+    return f"Player-{secrets.token_hex(4)}"     # anonymized alias
+
+def resolve_player(name: str) -> User:
+    """Look up (or register, with starter tasks) the player called `name`.
+
+    Invalid names get a fresh alias; compare the returned username to see
+    whether the client needs a new cookie.
+    """
+    if not _PLAYER_RE.match(name or ""):
+        name = new_player_name()
+    if name in game.users:
+        u = game.users[name]
+        game.refresh(u)
+    else:
+        u = game.register_user(name)
+        game.assign_daily_tasks(u, num_tasks=2)
+        game.assign_weekly_tasks(u, num_tasks=1)
+    return u
+
+def current_user() -> User:
+    """The player making this request, registered on first sight."""
+    if "player" in g:
+        return g.player
+    name = session.get(PLAYER_SESSION_KEY, "")
+    if TRUST_PLAYER_HEADER:
+        name = request.headers.get(PLAYER_HEADER) or name
+    u = resolve_player(name)
+    if session.get(PLAYER_SESSION_KEY) != u.username:
+        session[PLAYER_SESSION_KEY] = u.username
+        session.permanent = True
+    g.player = u
+    return u
+
+# The ASGI routes in ngameasgi.py read and write the same session cookie
+def session_player(cookie_value: str) -> str:
+    """The player name stored in a session cookie, or "" if it is missing or forged."""
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        data = serializer.loads(cookie_value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return ""
+    return data.get(PLAYER_SESSION_KEY, "") if isinstance(data, dict) else ""
+
+def session_cookie(name: str) -> str:
+    """A Set-Cookie value for a session naming `name` as the player."""
+    value = app.session_interface.get_signing_serializer(app).dumps({PLAYER_SESSION_KEY: name, "_permanent": True})
+    max_age = int(app.permanent_session_lifetime.total_seconds())
+    return (f"{app.config['SESSION_COOKIE_NAME']}={value}; Max-Age={max_age}; Path=/; "
+            f"SameSite=Lax; HttpOnly")
+
+# --- Helpers ---
+def add_points(u: User, pts: int):
+    game.add_points(u, pts)
 
 # --- Pages ---
 @app.route("/game")
@@ -46,12 +208,13 @@ def root():
 # --- State & tasks ---
 @app.route("/get_state", methods=["GET"])
 def get_state():
-    return jsonify(user.to_dict())
+    return jsonify(current_user().to_dict())
 
 @app.route("/complete_task", methods=["POST"])
 def complete_task():
     data = request.get_json(silent=True) or {}
     tid = data.get("taskId")
+    user = current_user()
     try:
         game.complete_task(user, tid)
         save_all()
@@ -60,112 +223,171 @@ def complete_task():
         return jsonify({"error": str(e)}), 400
 
 # --- Leaderboard (seed anonymized competitors so board isn't empty) ---
+_seed_lock = threading.Lock()
+
+def seed_competitors():
+    # Serialized so concurrent first requests don't award the points twice
+    with _seed_lock:
+        for alias, pts in [("Nova-A12", 220), ("Lyra-K5", 180), ("Orion-M3", 160)]:
+            if alias not in game.users:
+                game.add_points(game.register_user(alias), pts)
+
 @app.route("/leaderboard", methods=["GET"])
 def leaderboard():
-    for alias, pts in [("Nova-A12", 220), ("Lyra-K5", 180), ("Orion-M3", 160)]:
-        if alias not in game.users:
-            uu = game.register_user(alias)
-            uu.points = pts
-            game._update_level(uu)
+    seed_competitors()
 
     rows = game.get_leaderboard(top_n=10)  # [{'username':..., 'points':...}]
     with_rank = [{"rank": i + 1, **r} for i, r in enumerate(rows)]
     return jsonify(with_rank)
 
-# ======== Local heuristic fallback (keeps demo usable if Snowflake fails) ========
-def _heuristic_score(qtype: str, text: str, choice: str = ""):
-    s, tips = 0, []
-    t = (text or "").lower().strip()
-    ch = (choice or "").lower().strip()
-
-    def has_any(kws): return any(k in t for k in kws)
-
-    if qtype == "outreach":
-        if len(t.split()) >= 30: s += 1
-        if has_any(["accessibility","design","los angeles"," la ","ux"]): s += 2
-        if has_any(["i'm","i am","student","engineer","uwaterloo","cs"]): s += 2
-        if has_any(["15","15-min","15 minute","15 minutes"]): s += 2
-        if has_any(["thanks","appreciate","understand if not","no worries","totally fine if not"]): s += 3
-        if s < 10:
-            tips += [
-                "Reference their work/location directly (e.g., “your accessibility case study in LA”).",
-                "Make a specific, time-boxed ask (e.g., 15 minutes next week).",
-                "Add a respectful opt-out line."
-            ]
-    elif qtype == "coffee":
-        qs = [q.strip("-• ").strip() for q in text.split("\n") if q.strip()]
-        if 2 <= len(qs) <= 4: s += 3
-        if any(q.endswith("?") for q in qs): s += 3
-        if any(k in " ".join(qs).lower() for k in ["roadmap","a/b","experiment","tradeoff","stakeholder","impact"]): s += 2
-        if len(set([q.split()[0].lower() if q else "" for q in qs])) > 1: s += 2
-        if s < 10:
-            tips += ["Ask ≤3 open-ended, product-specific questions (e.g., trade-offs, experiment design)."]
-    elif qtype == "followup":
-        if ch in ["monday","tuesday","48h","2 days","early next week"]: s += 3
-        if any(k in t for k in ["thanks","great meeting","appreciate"]): s += 2
-        if s < 5:
-            tips += ["Follow up within 48–72 hours (e.g., Monday). Keep the subject clear and short."]
-    elif qtype == "reciprocity":
-        if any(k in t for k in ["share","resource","intro","connect","notes","feedback","link"]): s += 3
-        if len(t.split()) >= 10: s += 2
-        if s < 5:
-            tips += ["Offer something concrete: relevant article, intro, or feedback summary."]
-
-    return max(0, min(s, 10)), tips
+@app.route("/leaderboard/me", methods=["GET"])
+def leaderboard_me():
+    seed_competitors()
+    try:
+        window = int(request.args.get("window", 2))
+    except ValueError:
+        window = 2
+    window = max(0, min(window, 25))
+    return jsonify(game.get_rank(current_user().username, window=window))
 
 # ======== Snowflake-powered endpoints ========
-@app.route("/quest/start", methods=["POST"])
-def quest_start():
-    d = request.get_json(silent=True) or {}
-    qtype = d.get("type", "outreach")
+# Each endpoint is split into a prompt builder and a result builder that
+# takes the model's reply (None if the call failed). The Flask routes below
+# and the async routes in ngameasgi.py share them.
+DEFAULT_SCENARIO = "You’re a student reaching out to a mentor about their recent project."
 
+def quest_start_prompt(qtype: str) -> str:
     # Build a single prompt string (FIX 2: no messages list)
-    prompt = (
+    return (
         "System: Generate a realistic, concise 2–3 sentence practice scenario for student networking. "
         "Return JSON only as: {\"prompt\":\"...\"}.\n\n"
         f"User: TASK={qtype}. Audience: student networking practice."
     )
 
+def quest_start_result(qtype: str, content):
     try:
-        content = sf_complete(prompt)  # returns string
         obj = json.loads(content) if content.strip().startswith("{") else {}
-        prompt_out = obj.get("prompt") or "You’re a student reaching out to a mentor about their recent project."
+        prompt_out = obj.get("prompt") or DEFAULT_SCENARIO
         source = "snowflake"
     except Exception:
-        prompt_out = "You’re a student reaching out to a mentor about their recent project."
+        prompt_out = DEFAULT_SCENARIO
         source = "local"
+    return {"type": qtype, "scenario": {"prompt": prompt_out}, "source": source}
+
+# --- Pre-generated scenarios so /quest/start never waits on the LLM ---
+QUEST_TYPES = ("outreach", "coffee", "followup", "reciprocity")
+SCENARIO_POOL_SIZE = int(os.environ.get("SCENARIO_POOL_SIZE", "8"))
+SCENARIO_POOL_LOW  = int(os.environ.get("SCENARIO_POOL_LOW", "3"))
+
+class ScenarioPool:
+    """
+    Per-quest-type queues of ready-made scenarios. pop() is O(1) and never
+    blocks; a background thread tops a queue back up to `size` whenever it
+    falls below `low_water`, backing off while Snowflake is failing. The
+    thread starts on the first pop(), so importing the app (or forking
+    gunicorn workers) doesn't fire a round of Cortex calls per process.
+    """
+    def __init__(self, qtypes, size=8, low_water=3, retry_after=30.0):
+        self.size = size
+        self.low_water = low_water
+        self.retry_after = retry_after
+        self._pools = {q: deque() for q in qtypes}
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def pop(self, qtype):
+        """A pre-generated scenario for `qtype`, or None if none is ready."""
+        pool = self._pools.get(qtype)
+        if pool is None:
+            return None
+        self.start()
+        try:
+            scenario = pool.popleft()
+        except IndexError:
+            scenario = None
+        if len(pool) < self.low_water:
+            self._wake.set()
+        return scenario
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="scenario-pool", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _generate(self, qtype):
+        content = sf_complete(quest_start_prompt(qtype))
+        result = quest_start_result(qtype, content)
+        return result["scenario"]["prompt"] if result["source"] == "snowflake" else None
+
+    def _run(self):
+        while True:
+            # Clear before scanning: a pop() that drains a pool mid-pass
+            # must still wake the next pass
+            self._wake.clear()
+            failed = False
+            for qtype, pool in self._pools.items():
+                if len(pool) >= self.low_water:
+                    continue
+                while len(pool) < self.size:
+                    try:
+                        scenario = self._generate(qtype)
+                    except Exception:
+                        scenario = None
+                    if scenario is None:
+                        failed = True
+                        break
+                    pool.append(scenario)
+            self._wake.wait(self.retry_after if failed else None)
+
+scenario_pool = ScenarioPool(QUEST_TYPES, size=SCENARIO_POOL_SIZE, low_water=SCENARIO_POOL_LOW)
+
+def quest_start_pooled(qtype: str):
+    scenario = scenario_pool.pop(qtype)
+    if scenario is None:
+        return {"type": qtype, "scenario": {"prompt": DEFAULT_SCENARIO}, "source": "local"}
+    return {"type": qtype, "scenario": {"prompt": scenario}, "source": "snowflake"}
 
-    return jsonify({"type": qtype, "scenario": {"prompt": prompt_out}, "source": source})
-
-@app.route("/quest/score", methods=["POST"])
-def quest_score():
+@app.route("/quest/start", methods=["POST"])
+def quest_start():
     d = request.get_json(silent=True) or {}
-    qtype  = d.get("type", "outreach")
-    text   = d.get("text", "")
-    choice = d.get("choice", "")
-
-    rubric = (
-        "Return JSON exactly: {\"score\": <0-10>, \"tips\": [\"tip1\",\"tip2\"]}.\n"
-        "Rubrics:\n"
-        "- outreach: personalization(2), clarity(2), specific ask(3), respectful tone/opt-out(3).\n"
-        "- coffee: relevance(3), open-ended(3), depth(2), variety(2).\n"
-        "- followup: timing(3), subject clarity(2).\n"
-        "- reciprocity: actionable(3), appropriate(2).\n"
-    )
-    prompt = (
+    return jsonify(quest_start_pooled(d.get("type", "outreach")))
+
+SCORE_RUBRIC = (
+    "Rubrics:\n"
+    "- outreach: personalization(2), clarity(2), specific ask(3), respectful tone/opt-out(3).\n"
+    "- coffee: relevance(3), open-ended(3), depth(2), variety(2).\n"
+    "- followup: timing(3), subject clarity(2).\n"
+    "- reciprocity: actionable(3), appropriate(2).\n"
+)
+
+def quest_score_prompt(qtype: str, text: str, choice: str) -> str:
+    rubric = "Return JSON exactly: {\"score\": <0-10>, \"tips\": [\"tip1\",\"tip2\"]}.\n" + SCORE_RUBRIC
+    return (
         "System: You are a concise networking coach. Reply with compact JSON only.\n\n"
         f"User:\nTask={qtype}\nText:\n{text}\nChoice:{choice}\n{rubric}"
     )
 
-    used_snowflake = True
+def parse_score_reply(content):
+    """(score, tips) from a model reply, or None if it is missing/unusable."""
     try:
-        content = sf_complete(prompt)
         obj = json.loads(content) if content.strip().startswith("{") else {}
-        score = int(obj.get("score", 0))
-        tips  = (obj.get("tips") or [])[:2]
+        return int(obj.get("score", 0)), (obj.get("tips") or [])[:2]
     except Exception:
-        used_snowflake = False
-        score, tips = _heuristic_score(qtype, text, choice)
+        return None
+
+def quest_score_result(user: User, qtype: str, text: str, choice: str, content):
+    """Score a submission from the model reply (or the heuristic) and award points."""
+    parsed = parse_score_reply(content)
+    used_snowflake = parsed is not None
+    if used_snowflake:
+        score, tips = parsed
+    else:
+        score, tips = heuristic_score(qtype, text, choice)
         if not tips:
             tips = ["(Snowflake offline) Be specific about why you’re reaching out.",
                     "Make a 15-min time-boxed ask."]
@@ -177,45 +399,261 @@ def quest_score():
     rows = game.get_leaderboard(top_n=10)
     leaderboard_rows = [{"rank": i + 1, **r} for i, r in enumerate(rows)]
 
-    return jsonify({
+    return {
         "earned": score,
         "tips": tips,
         "leaderboard": leaderboard_rows,
         "points": user.points,
         "source": "snowflake" if used_snowflake else "local"
-    })
+    }
+
+# --- Deadline-bounded scoring ---
+# With SCORE_DEADLINE > 0 the Snowflake call races a timer: if the model has
+# not answered by then the player gets the heuristic score straight away, and
+# the model's late answer is kept next to the heuristic one for calibration.
+SCORE_DEADLINE = float(os.environ.get("SCORE_DEADLINE", "0"))  # seconds; 0 = always wait
+SCORE_WORKERS = int(os.environ.get("SCORE_WORKERS", "16"))
+CALIBRATION_PATH = os.environ.get("SCORE_CALIBRATION_PATH", "")  # empty = memory only
+
+class ScoreCalibration:
+    """Heuristic vs. model scores for submissions that missed the deadline."""
+    def __init__(self, maxlen=1000, filepath=""):
+        self.filepath = filepath
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, qtype: str, text: str, choice: str, content):
+        parsed = parse_score_reply(content)
+        if parsed is None:
+            return
+        heuristic, _ = heuristic_score(qtype, text, choice)
+        sample = {"type": qtype, "heuristic": heuristic,
+                  "llm": max(0, min(parsed[0], 10)), "at": time.time()}
+        with self._lock:
+            self._samples.append(sample)
+            if self.filepath:
+                with open(self.filepath, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(sample) + "\n")
+
+    def stats(self):
+        """Per quest type: sample count and mean (llm - heuristic) score."""
+        with self._lock:
+            samples = list(self._samples)
+        deltas = defaultdict(list)
+        for s in samples:
+            deltas[s["type"]].append(s["llm"] - s["heuristic"])
+        return {q: {"n": len(d), "mean_delta": sum(d) / len(d)} for q, d in deltas.items()}
+
+score_calibration = ScoreCalibration(filepath=CALIBRATION_PATH)
+_score_executor = ThreadPoolExecutor(max_workers=SCORE_WORKERS, thread_name_prefix="quest-score")
+
+# --- Micro-batched scoring ---
+# With SCORE_BATCH_WINDOW > 0, submissions arriving within that many seconds
+# of each other are scored by a single Cortex call (up to SCORE_BATCH_MAX).
+SCORE_BATCH_WINDOW = float(os.environ.get("SCORE_BATCH_WINDOW", "0"))  # seconds; 0 = off
+SCORE_BATCH_MAX = int(os.environ.get("SCORE_BATCH_MAX", "16"))
+SCORE_TOKENS_PER_ITEM = 120
+
+def quest_score_batch_prompt(items) -> str:
+    """One prompt scoring several (qtype, text, choice) submissions, ids 1..n."""
+    parts = [
+        f"#{i} Task={qtype} Choice:{choice}\nText:\n{text}\n"
+        for i, (qtype, text, choice) in enumerate(items, 1)
+    ]
+    return (
+        "System: You are a concise networking coach. Score each numbered submission "
+        "independently. Reply with compact JSON only.\n\n"
+        "User:\n" + "\n".join(parts) +
+        "Return JSON exactly: {\"results\": [{\"id\": <n>, \"score\": <0-10>, "
+        "\"tips\": [\"tip1\",\"tip2\"]}, ...]} with one entry per submission.\n" + SCORE_RUBRIC
+    )
 
-@app.route("/coach/chat", methods=["POST"])
-def coach_chat():
-    data = request.get_json(silent=True) or {}
-    user_text = (data.get("text") or "").strip()
+def parse_score_batch_reply(content, n: int):
+    """Per-item single-score replies (JSON strings) by position; None where missing."""
+    replies = [None] * n
+    try:
+        results = json.loads(content.strip()).get("results") or []
+    except Exception:
+        return replies
+    for r in results:
+        try:
+            i = int(r["id"]) - 1
+            if 0 <= i < n and replies[i] is None:
+                replies[i] = json.dumps({"score": int(r.get("score", 0)), "tips": r.get("tips") or []})
+        except Exception:
+            continue
+    return replies
+
+class ScoreBatcher:
+    """
+    Collects score requests for up to `window` seconds (or `max_items`) and
+    sends each batch as one multi-item prompt. submit() returns a Future
+    that resolves to the same single-item JSON reply quest_score_result
+    expects, so callers don't care whether their item was batched.
+    """
+    def __init__(self, window=0.05, max_items=16, executor=None):
+        self.window = window
+        self.max_items = max_items
+        self._executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="score-batch")
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, qtype: str, text: str, choice: str) -> Future:
+        future = Future()
+        with self._cond:
+            self._pending.append(((qtype, text, choice), future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="score-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                closes = time.monotonic() + self.window
+                while len(self._pending) < self.max_items:
+                    remaining = closes - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_items]
+                del self._pending[:self.max_items]
+            # Send from the pool so the next window starts collecting at once
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        batch = [(item, f) for item, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            if len(batch) == 1:
+                replies = [sf_complete(quest_score_prompt(*batch[0][0]))]
+            else:
+                content = sf_complete(quest_score_batch_prompt([item for item, _ in batch]),
+                                      max_tokens=SCORE_TOKENS_PER_ITEM * len(batch))
+                replies = parse_score_batch_reply(content, len(batch))
+        except Exception as e:
+            for _, f in batch:
+                f.set_exception(e)
+            return
+        for (_, f), reply in zip(batch, replies):
+            f.set_result(reply)
+
+score_batcher = (ScoreBatcher(window=SCORE_BATCH_WINDOW, max_items=SCORE_BATCH_MAX, executor=_score_executor)
+                 if SCORE_BATCH_WINDOW > 0 else None)
+
+def submit_score(qtype: str, text: str, choice: str) -> Future:
+    """Start scoring in the background (batched if enabled); resolves to the model reply."""
+    if score_batcher is not None:
+        return score_batcher.submit(qtype, text, choice)
+    return _score_executor.submit(sf_complete, quest_score_prompt(qtype, text, choice))
+
+def score_reply_within_deadline(qtype: str, text: str, choice: str):
+    """The model's reply, or None on failure or if SCORE_DEADLINE passes first."""
+    if SCORE_DEADLINE <= 0 and score_batcher is None:
+        try:
+            return sf_complete(quest_score_prompt(qtype, text, choice))
+        except Exception:
+            return None
+    future = submit_score(qtype, text, choice)
+    try:
+        return future.result(timeout=SCORE_DEADLINE if SCORE_DEADLINE > 0 else None)
+    except FutureTimeout:
+        def record_late(f):
+            if f.exception() is None:
+                score_calibration.record(qtype, text, choice, f.result())
+        future.add_done_callback(record_late)
+        return None
+    except Exception:
+        return None
+
+@app.route("/quest/score", methods=["POST"])
+def quest_score():
+    d = request.get_json(silent=True) or {}
+    qtype  = d.get("type", "outreach")
+    text   = d.get("text", "")
+    choice = d.get("choice", "")
+    content = score_reply_within_deadline(qtype, text, choice)
+    return jsonify(quest_score_result(current_user(), qtype, text, choice, content))
+
+@app.get("/_score_calibration")
+def score_calibration_stats():
+    return jsonify({"deadline": SCORE_DEADLINE, "by_type": score_calibration.stats()})
 
-    prompt = (
+def coach_prompt(user_text: str) -> str:
+    return (
         "System: You are a practical networking coach. Answer in 2–4 concise sentences with concrete examples. Avoid fluff.\n\n"
         f"User: {user_text}"
     )
-    try:
-        reply = sf_complete(prompt) or "Try again with one specific situation."
-        source = "snowflake"
-    except Exception:
-        reply = "Snowflake is busy—try again shortly. Tip: include a concrete detail and a 15-min ask."
-        source = "local"
 
-    return jsonify({"reply": reply, "source": source})
+def coach_result(content):
+    if content is None:
+        return {"reply": "Snowflake is busy—try again shortly. Tip: include a concrete detail and a 15-min ask.",
+                "source": "local"}
+    return {"reply": content or "Try again with one specific situation.", "source": "snowflake"}
 
-@app.route("/quest/rewrite", methods=["POST"])
-def quest_rewrite():
-    d = request.get_json(silent=True) or {}
-    text = (d.get("text") or "").strip()
+@app.route("/coach/chat", methods=["POST"])
+def coach_chat():
+    data = request.get_json(silent=True) or {}
+    user_text = (data.get("text") or "").strip()
+    try:
+        content = sf_complete(coach_prompt(user_text))
+    except Exception:
+        content = None
+    return jsonify(coach_result(content))
+
+# --- Streaming coach chat (Server-Sent Events) ---
+# Each piece of the reply is sent as `data: {"delta": ...}` the moment Cortex
+# produces it; a final `event: done` carries the source. If Snowflake fails
+# before the first piece, the local fallback reply is streamed instead.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(obj, event=None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(obj)}\n\n"
+
+def coach_fallback_events():
+    result = coach_result(None)
+    yield sse_event({"delta": result["reply"]})
+    yield sse_event({"source": result["source"]}, event="done")
+
+@app.route("/coach/stream", methods=["POST"])
+def coach_stream():
+    data = request.get_json(silent=True) or {}
+    user_text = (data.get("text") or "").strip()
 
-    prompt = (
+    def events():
+        sent = False
+        try:
+            for piece in sf_complete_stream(coach_prompt(user_text)):
+                sent = True
+                yield sse_event({"delta": piece})
+        except Exception:
+            if not sent:
+                yield from coach_fallback_events()
+                return
+            yield sse_event({"source": "snowflake", "truncated": True}, event="done")
+            return
+        if not sent:
+            yield sse_event({"delta": coach_result("")["reply"]})
+        yield sse_event({"source": "snowflake"}, event="done")
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+def rewrite_prompt(text: str) -> str:
+    return (
         "System: Rewrite the message into 2–4 tight, friendly sentences. "
         "Keep it specific and include a 15-minute time-boxed ask. "
         "Return JSON exactly as {\"text\":\"...\"}.\n\n"
         f"User: {text}"
     )
+
+def rewrite_result(text: str, content):
     try:
-        content = sf_complete(prompt)
         if content.strip().startswith("{"):
             obj = json.loads(content)
             new_text = (obj.get("text") or "").strip()
@@ -228,20 +666,28 @@ def quest_rewrite():
     except Exception:
         new_text = text  # FIX 3: fallback returns original, not empty
         source = "local"
+    return {"text": new_text, "source": source}
 
-    return jsonify({"text": new_text, "source": source})
+@app.route("/quest/rewrite", methods=["POST"])
+def quest_rewrite():
+    d = request.get_json(silent=True) or {}
+    text = (d.get("text") or "").strip()
+    try:
+        content = sf_complete(rewrite_prompt(text))
+    except Exception:
+        content = None
+    return jsonify(rewrite_result(text, content))
 
 # --- Health endpoint to verify Snowflake connectivity (optional) ---
+HEALTH_PROMPT = "Reply with the single word: OK."
+
 @app.get("/_snowflake_health")
 def snowflake_health():
     try:
-        out = sf_complete("Reply with the single word: OK.")
-        return jsonify({"ok": True, "sample": out[:80]})
+        out = sf_complete(HEALTH_PROMPT)  # never cached: must reflect Snowflake right now
+        return jsonify({"ok": True, "sample": out[:80], "breaker": breaker.stats()})
     except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
-
-# --- load saved progress on boot ---
-load_all()
+        return jsonify({"ok": False, "error": str(e), "breaker": breaker.stats()}), 500
 
 # --- main ---
 if __name__ == "__main__":
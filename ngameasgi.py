@@ -0,0 +1,186 @@
+# ngameasgi.py — ASGI entry point: LLM routes served async, everything else via Flask
+#
+# Run with an ASGI server, e.g.
+#   gunicorn -k uvicorn.workers.UvicornWorker ngameasgi:app
+#
+# The Snowflake-backed routes await sf_complete_async, so one worker can keep
+# thousands of slow completions in flight instead of blocking a thread per
+# call. All other paths (pages, state, tasks, leaderboard) are passed to the
+# Flask app in ngameapp.py unchanged.
+import asyncio, json
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import parse_cookie
+
+import ngameapp
+from snowflake_client import sf_complete_async, sf_complete_stream_async, close_async_client, breaker
+
+flask_app = WsgiToAsgi(ngameapp.app)
+
+# --- Small ASGI helpers ---
+async def read_json(receive):
+    body = b""
+    while True:
+        msg = await receive()
+        body += msg.get("body", b"")
+        if not msg.get("more_body"):
+            break
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+async def send_json(send, obj, status=200, headers=()):
+    body = json.dumps(obj).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())] + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def request_player_name(scope):
+    """(name to resolve, name in the session cookie) — see ngameapp.current_user."""
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    # Parsed the way Flask parses it, so both entry points see the same cookies
+    cookies = parse_cookie(headers.get("cookie", ""))
+    cookie_name = ngameapp.app.config["SESSION_COOKIE_NAME"]
+    in_session = ngameapp.session_player(cookies[cookie_name]) if cookie_name in cookies else ""
+    if ngameapp.TRUST_PLAYER_HEADER:
+        return headers.get(ngameapp.PLAYER_HEADER.lower()) or in_session, in_session
+    return in_session, in_session
+
+def player_cookie_header(name):
+    return (b"set-cookie", ngameapp.session_cookie(name).encode())
+
+async def complete_or_none(prompt):
+    try:
+        return await sf_complete_async(prompt)
+    except Exception:
+        return None
+
+async def batched_or_none(qtype, text, choice):
+    try:
+        return await asyncio.wrap_future(ngameapp.score_batcher.submit(qtype, text, choice))
+    except Exception:
+        return None
+
+# Late completions that are still being awaited for calibration
+_late_scores = set()
+
+async def score_reply_within_deadline(qtype, text, choice):
+    """Async counterpart of ngameapp.score_reply_within_deadline."""
+    if ngameapp.score_batcher is not None:
+        call = batched_or_none(qtype, text, choice)
+    else:
+        call = complete_or_none(ngameapp.quest_score_prompt(qtype, text, choice))
+    if ngameapp.SCORE_DEADLINE <= 0:
+        return await call
+    task = asyncio.ensure_future(call)
+    done, _ = await asyncio.wait({task}, timeout=ngameapp.SCORE_DEADLINE)
+    if task in done:
+        return task.result()
+
+    def record_late(t):
+        _late_scores.discard(t)
+        if not t.cancelled() and t.result() is not None:
+            ngameapp.score_calibration.record(qtype, text, choice, t.result())
+    _late_scores.add(task)
+    task.add_done_callback(record_late)
+    return None
+
+# --- Async routes (same prompts and result handling as ngameapp) ---
+async def quest_start(scope, receive, send):
+    d = await read_json(receive)
+    await send_json(send, ngameapp.quest_start_pooled(d.get("type", "outreach")))
+
+async def quest_score(scope, receive, send):
+    d = await read_json(receive)
+    qtype  = d.get("type", "outreach")
+    text   = d.get("text", "")
+    choice = d.get("choice", "")
+    content = await score_reply_within_deadline(qtype, text, choice)
+
+    # Game updates may wait on storage locks; keep them off the event loop
+    name, cookie = request_player_name(scope)
+    user = await asyncio.to_thread(ngameapp.resolve_player, name)
+    result = await asyncio.to_thread(ngameapp.quest_score_result, user, qtype, text, choice, content)
+    headers = [player_cookie_header(user.username)] if cookie != user.username else []
+    await send_json(send, result, headers=headers)
+
+async def coach_chat(scope, receive, send):
+    d = await read_json(receive)
+    user_text = (d.get("text") or "").strip()
+    content = await complete_or_none(ngameapp.coach_prompt(user_text))
+    await send_json(send, ngameapp.coach_result(content))
+
+async def coach_stream(scope, receive, send):
+    d = await read_json(receive)
+    user_text = (d.get("text") or "").strip()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream")] +
+                   [(k.lower().encode(), v.encode()) for k, v in ngameapp.SSE_HEADERS.items()],
+    })
+
+    async def emit(chunk):
+        await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+
+    sent = False
+    try:
+        async for piece in sf_complete_stream_async(ngameapp.coach_prompt(user_text)):
+            sent = True
+            await emit(ngameapp.sse_event({"delta": piece}))
+        if not sent:
+            await emit(ngameapp.sse_event({"delta": ngameapp.coach_result("")["reply"]}))
+        await emit(ngameapp.sse_event({"source": "snowflake"}, event="done"))
+    except Exception:
+        if sent:
+            await emit(ngameapp.sse_event({"source": "snowflake", "truncated": True}, event="done"))
+        else:
+            for event in ngameapp.coach_fallback_events():
+                await emit(event)
+    await send({"type": "http.response.body", "body": b""})
+
+async def quest_rewrite(scope, receive, send):
+    d = await read_json(receive)
+    text = (d.get("text") or "").strip()
+    content = await complete_or_none(ngameapp.rewrite_prompt(text))
+    await send_json(send, ngameapp.rewrite_result(text, content))
+
+async def snowflake_health(scope, receive, send):
+    try:
+        out = await sf_complete_async(ngameapp.HEALTH_PROMPT)  # never cached: must reflect Snowflake right now
+        await send_json(send, {"ok": True, "sample": out[:80], "breaker": breaker.stats()})
+    except Exception as e:
+        await send_json(send, {"ok": False, "error": str(e), "breaker": breaker.stats()}, status=500)
+
+ROUTES = {
+    ("POST", "/quest/start"):       quest_start,
+    ("POST", "/quest/score"):       quest_score,
+    ("POST", "/coach/chat"):        coach_chat,
+    ("POST", "/coach/stream"):      coach_stream,
+    ("POST", "/quest/rewrite"):     quest_rewrite,
+    ("GET",  "/_snowflake_health"): snowflake_health,
+}
+
+async def lifespan(scope, receive, send):
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            await close_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    if scope["type"] == "http":
+        handler = ROUTES.get((scope["method"], scope["path"]))
+        if handler is not None:
+            return await handler(scope, receive, send)
+    await flask_app(scope, receive, send)
@@ -1,12 +1,123 @@
-import os, json, requests
+import os, re, json, time, hashlib, asyncio, threading, weakref, requests
+from collections import OrderedDict, deque
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx  # optional: enables non-blocking sf_complete_async
+except ImportError:
+    httpx = None
 
 BASE  = os.environ.get("SNOWFLAKE_BASE", "").rstrip("/")
 TOKEN = os.environ.get("SNOWFLAKE_API_TOKEN", "")
 MODEL = os.environ.get("SNOWFLAKE_MODEL", "mistral-large")
+# Max keep-alive connections kept open to Snowflake (per worker process)
+POOL_SIZE = int(os.environ.get("SNOWFLAKE_POOL_SIZE", "10"))
+# Max concurrent in-flight requests per event loop for sf_complete_async
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("SNOWFLAKE_ASYNC_MAX_CONNECTIONS", "200"))
+TIMEOUT = 30
+# Shared response cache settings (see ResponseCache / response_cache below)
+CACHE_TTL   = float(os.environ.get("SNOWFLAKE_CACHE_TTL", "300"))
+CACHE_SIZE  = int(os.environ.get("SNOWFLAKE_CACHE_SIZE", "1024"))
+CACHE_PATH  = os.environ.get("SNOWFLAKE_CACHE_PATH", "")  # empty = memory only
+# Circuit breaker: open after this many consecutive failures, stay open this
+# many seconds, and never time out faster than BREAKER_MIN_TIMEOUT.
+BREAKER_FAILURES    = int(os.environ.get("SNOWFLAKE_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN    = float(os.environ.get("SNOWFLAKE_BREAKER_COOLDOWN", "30"))
+BREAKER_MIN_TIMEOUT = float(os.environ.get("SNOWFLAKE_BREAKER_MIN_TIMEOUT", "2"))
 
 class SnowflakeError(RuntimeError):
     pass
 
+class SnowflakeBadRequest(SnowflakeError):
+    """400 — the prompt/payload was rejected; the service itself is healthy."""
+
+class CircuitOpenError(SnowflakeError):
+    """Raised without calling Snowflake while the circuit breaker is open."""
+
+# ======== Circuit breaker ========
+class CircuitBreaker:
+    """
+    Fails fast while Snowflake is degraded so callers drop straight to their
+    local fallback instead of waiting out the full timeout.
+
+    closed    -> calls go through; `max_failures` consecutive failures open it
+    open      -> calls raise CircuitOpenError until `cooldown` seconds pass
+    half-open -> a single probe call is let through; success closes the
+                 circuit, failure re-opens it
+
+    timeout() adapts the per-call timeout to the observed p99 latency of
+    recent successful calls (x `headroom`), clamped to [min_timeout,
+    max_timeout], so a slow-but-alive service isn't cut off and a hung one
+    isn't waited on for the full 30s.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, max_failures=5, cooldown=30.0, min_timeout=2.0, max_timeout=30.0,
+                 headroom=1.5, samples=200, min_samples=20):
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._latencies = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not be attempted."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    raise CircuitOpenError("Snowflake circuit open — failing fast")
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError("Snowflake circuit half-open — probe in flight")
+                self._probing = True
+
+    def record_success(self, latency: float = None):
+        # Streamed calls pass no latency: time-to-first-token says nothing
+        # about how long a full completion takes, so it stays out of p99
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self._failures = 0
+            self._probing = False
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self._failures >= self.max_failures:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def p99(self):
+        with self._lock:
+            lat = sorted(self._latencies)
+        if len(lat) < self.min_samples:
+            return None
+        return lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+
+    def timeout(self) -> float:
+        p99 = self.p99()
+        if p99 is None:
+            return self.max_timeout
+        return max(self.min_timeout, min(self.max_timeout, p99 * self.headroom))
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self._failures,
+                "p99": self.p99(), "timeout": self.timeout()}
+
+breaker = CircuitBreaker(max_failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN,
+                         min_timeout=BREAKER_MIN_TIMEOUT, max_timeout=TIMEOUT)
+
 def _assert_env():
     missing = []
     if not BASE:  missing.append("SNOWFLAKE_BASE")
@@ -15,34 +126,149 @@ def _assert_env():
     if missing:
         raise SnowflakeError(f"Missing env: {', '.join(missing)}")
 
-def _post_json(url, payload):
-    headers = {
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session():
+    """
+    Shared HTTP/1.1 session so calls reuse pooled keep-alive connections
+    instead of paying a TCP + TLS handshake each time. The underlying
+    urllib3 pool is thread-safe; up to POOL_SIZE idle connections are kept.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({"Connection": "keep-alive"})
+                _session = s
+    return _session
+
+def close_session():
+    """Close pooled connections (e.g. at worker shutdown)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+# ======== Response cache ========
+class ResponseCache:
+    """
+    TTL + LRU cache of completion text keyed on the normalized prompt
+    (whitespace collapsed), max_tokens and model. Thread-safe. If `path` is
+    set, entries are appended to a JSON-lines file and reloaded (newest
+    wins, expired dropped) when the cache is created.
+    """
+    def __init__(self, ttl: float = 300, max_entries: int = 1024, path: str = ""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()   # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def key(prompt: str, max_tokens: int) -> str:
+        norm = re.sub(r"\s+", " ", prompt).strip()
+        return hashlib.sha256(f"{MODEL}\x00{max_tokens}\x00{norm}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: str, text: str):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._put(key, expires, text)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"k": key, "x": expires, "t": text}, ensure_ascii=False) + "\n")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _put(self, key, expires, text):
+        self._entries[key] = (expires, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("x", 0) > now:
+                    self._put(rec["k"], rec["x"], rec["t"])
+        # Rewrite the file so it only holds live entries
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for k, (x, t) in self._entries.items():
+                f.write(json.dumps({"k": k, "x": x, "t": t}, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+# Shared cache; endpoints opt in with sf_complete(..., cache=response_cache)
+response_cache = ResponseCache(ttl=CACHE_TTL, max_entries=CACHE_SIZE, path=CACHE_PATH)
+
+def _headers():
+    return {
         "Authorization": f"Bearer {TOKEN}",
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
-    r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
-    if r.status_code == 401:
+
+def _check_status(status, reason, text, json_fn):
+    if status == 401:
         raise SnowflakeError("401 Unauthorized — invalid/expired token or wrong account.")
-    if r.status_code == 403:
+    if status == 403:
         raise SnowflakeError("403 Forbidden — permissions/network policy.")
-    if r.status_code == 404:
+    if status == 404:
         raise SnowflakeError("404 Not Found — endpoint path may differ for your account.")
-    if r.status_code == 400:
+    if status == 400:
         try:
-            msg = r.json()
+            msg = json_fn()
         except Exception:
-            msg = r.text
-        raise SnowflakeError(f"400 Bad Request — {msg}")
-    if not r.ok:
-        raise SnowflakeError(f"{r.status_code} {r.reason}: {r.text}")
+            msg = text
+        raise SnowflakeBadRequest(f"400 Bad Request — {msg}")
+    if status >= 400:
+        raise SnowflakeError(f"{status} {reason}: {text}")
+
+def _post_json(url, payload):
+    breaker.before_call()
+    t0 = time.monotonic()
+    try:
+        r = _get_session().post(url, headers=_headers(), data=json.dumps(payload), timeout=breaker.timeout())
+        _check_status(r.status_code, r.reason, r.text, r.json)
+    except SnowflakeBadRequest:
+        breaker.record_success(time.monotonic() - t0)
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success(time.monotonic() - t0)
     return r.json()
 
-def sf_complete(prompt: str, max_tokens: int = 300) -> str:
-    """
-    Calls Snowflake Cortex inference:complete endpoint with a simple prompt.
-    Returns the assistant text. Requires env vars: SNOWFLAKE_BASE, SNOWFLAKE_API_TOKEN, SNOWFLAKE_MODEL
-    """
+def _complete_request(prompt: str, max_tokens: int):
     _assert_env()
     url = f"{BASE}/api/v2/cortex/inference:complete"
     payload = {
@@ -54,8 +280,9 @@ def sf_complete(prompt: str, max_tokens: int = 300) -> str:
         "max_tokens": max_tokens,
         "temperature": 0.4
     }
-    data = _post_json(url, payload)
+    return url, payload
 
+def _extract_text(data) -> str:
     # Normalize multiple possible response shapes
     txt = None
     if isinstance(data, dict):
@@ -68,4 +295,173 @@ def sf_complete(prompt: str, max_tokens: int = 300) -> str:
             txt = data["candidates"][0].get("content")
     if not txt:
         raise SnowflakeError(f"Unexpected response: {data}")
-    return txt.strip()
\ No newline at end of file
+    return txt.strip()
+
+def sf_complete(prompt: str, max_tokens: int = 300, cache: ResponseCache = None) -> str:
+    """
+    Calls Snowflake Cortex inference:complete endpoint with a simple prompt.
+    Returns the assistant text. Requires env vars: SNOWFLAKE_BASE, SNOWFLAKE_API_TOKEN, SNOWFLAKE_MODEL
+    Pass a ResponseCache (e.g. response_cache) to serve repeated prompts locally.
+    """
+    if cache is not None:
+        key = cache.key(prompt, max_tokens)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    url, payload = _complete_request(prompt, max_tokens)
+    txt = _extract_text(_post_json(url, payload))
+    if cache is not None:
+        cache.set(key, txt)
+    return txt
+
+# ======== Streaming ========
+# With "stream": true Cortex answers as Server-Sent Events, one JSON chunk per
+# "data:" line carrying the next piece of text in choices[0].delta.
+
+def _stream_request(prompt: str, max_tokens: int):
+    url, payload = _complete_request(prompt, max_tokens)
+    payload["stream"] = True
+    headers = dict(_headers(), Accept="text/event-stream")
+    return url, payload, headers
+
+def _extract_delta(line: str) -> str:
+    """Text carried by one SSE line ("" for comments, keep-alives and [DONE])."""
+    if not line or not line.startswith("data:"):
+        return ""
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return ""
+    try:
+        obj = json.loads(data)
+    except ValueError:
+        return ""
+    choices = obj.get("choices") if isinstance(obj, dict) else None
+    if isinstance(choices, list) and choices:
+        delta = choices[0].get("delta") or {}
+        return delta.get("content") or delta.get("text") or ""
+    return ""
+
+def sf_complete_stream(prompt: str, max_tokens: int = 300):
+    """
+    Like sf_complete, but yields the reply in pieces as Cortex generates it.
+    Streamed successes close the breaker but don't feed its timeout estimate.
+    """
+    url, payload, headers = _stream_request(prompt, max_tokens)
+    breaker.before_call()
+    first = True
+    try:
+        with _get_session().post(url, headers=headers, data=json.dumps(payload),
+                                 timeout=breaker.timeout(), stream=True) as r:
+            _check_status(r.status_code, r.reason, r.text, r.json)
+            for line in r.iter_lines(decode_unicode=True):
+                piece = _extract_delta(line)
+                if piece:
+                    if first:
+                        breaker.record_success()
+                        first = False
+                    yield piece
+    except SnowflakeBadRequest:
+        breaker.record_success()
+        raise
+    except GeneratorExit:
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    if first:
+        breaker.record_success()
+
+# ======== Async variant ========
+# One pooled httpx.AsyncClient per event loop (clients can't cross loops).
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                                max_keepalive_connections=POOL_SIZE),
+        )
+        _async_clients[loop] = client
+    return client
+
+async def close_async_client():
+    """Close the current event loop's pooled client (e.g. on ASGI shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def sf_complete_async(prompt: str, max_tokens: int = 300, cache: ResponseCache = None) -> str:
+    """
+    Non-blocking sf_complete. While awaiting Snowflake the event loop keeps
+    serving other requests, so many slow completions can be in flight on one
+    worker. Without httpx installed, falls back to sf_complete on a thread.
+    """
+    if httpx is None:
+        return await asyncio.to_thread(sf_complete, prompt, max_tokens, cache)
+    if cache is not None:
+        key = cache.key(prompt, max_tokens)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    url, payload = _complete_request(prompt, max_tokens)
+    breaker.before_call()
+    t0 = time.monotonic()
+    try:
+        r = await _get_async_client().post(url, headers=_headers(), content=json.dumps(payload),
+                                           timeout=breaker.timeout())
+        _check_status(r.status_code, r.reason_phrase, r.text, r.json)
+    except SnowflakeBadRequest:
+        breaker.record_success(time.monotonic() - t0)
+        raise
+    except BaseException:
+        # Includes cancellation, so a cancelled half-open probe frees the slot
+        breaker.record_failure()
+        raise
+    breaker.record_success(time.monotonic() - t0)
+    txt = _extract_text(r.json())
+    if cache is not None:
+        cache.set(key, txt)
+    return txt
+
+async def sf_complete_stream_async(prompt: str, max_tokens: int = 300):
+    """
+    Async sf_complete_stream. Without httpx installed, yields the whole reply
+    from sf_complete_async as a single piece.
+    """
+    if httpx is None:
+        yield await sf_complete_async(prompt, max_tokens)
+        return
+    url, payload, headers = _stream_request(prompt, max_tokens)
+    breaker.before_call()
+    first = True
+    try:
+        async with _get_async_client().stream("POST", url, headers=headers, content=json.dumps(payload),
+                                              timeout=breaker.timeout()) as r:
+            if r.status_code >= 400:
+                await r.aread()
+            _check_status(r.status_code, r.reason_phrase, r.text if r.status_code >= 400 else "", r.json)
+            async for line in r.aiter_lines():
+                piece = _extract_delta(line)
+                if piece:
+                    if first:
+                        breaker.record_success()
+                        first = False
+                    yield piece
+    except SnowflakeBadRequest:
+        breaker.record_success()
+        raise
+    except GeneratorExit:
+        raise
+    except asyncio.CancelledError:
+        # A cancelled probe must free the half-open slot; later cancels are the client's doing
+        if first:
+            breaker.record_failure()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    if first:
+        breaker.record_success()
@@ -2,6 +2,7 @@
 console.log("[game] script loaded");
 
 let currentQuest = { type: "outreach", choice: "" };
+let me = null;  // this player's username, learned from /get_state
 
 // Prettier, game-like labels for badge IDs
 const BADGE_LABELS = {
@@ -34,8 +35,7 @@ async function loadLeaderboard() {
       return;
     }
 
-    const me = "Player-001";
-    rows.forEach(r => {
+    const addRow = r => {
       const tr = document.createElement("tr");
       if (r.username === me) tr.classList.add("me");
       tr.innerHTML = `
@@ -44,7 +44,14 @@ async function loadLeaderboard() {
         <td class="pts">${r.points ?? 0}</td>
       `;
       body.appendChild(tr);
-    });
+    };
+    rows.forEach(addRow);
+
+    // If the player isn't in the top rows, show where they stand
+    if (!rows.some(r => r.username === me)) {
+      const mine = await (await fetch("/leaderboard/me?window=0")).json();
+      if (mine && mine.entry) addRow(mine.entry);
+    }
   } catch (e) {
     console.error("[game] loadLeaderboard error:", e);
   }
@@ -55,6 +62,7 @@ async function loadState() {
   try {
     const res = await fetch("/get_state");
     const data = await res.json();
+    me = data.username ?? me;
 
     setText("points", data.points ?? 0);
     setText("streak", data.streak ?? 0);
@@ -251,6 +259,56 @@ function wireCoach() {
       : `<b>Coach:</b> ${escapeHtml(text)}`;
     feed.appendChild(div);
     feed.scrollTop = feed.scrollHeight;
+    return div;
+  }
+
+  // Streams the reply from /coach/stream (SSE over fetch), appending each
+  // delta as it arrives. If the stream breaks, whatever arrived is kept and
+  // counts as the reply; resolves false (with no bubble left behind) only
+  // if nothing was streamed, so the caller can fall back to /coach/chat.
+  async function streamReply(txt) {
+    const res = await fetch("/coach/stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
+      body: JSON.stringify({ text: txt })
+    });
+    if (!res.ok || !res.body) return false;
+
+    const div = push("assistant", "");
+    const out = document.createElement("span");
+    div.appendChild(out);
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = "", got = false;
+    try {
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+        let cut;
+        while ((cut = buf.indexOf("\n\n")) >= 0) {
+          const block = buf.slice(0, cut);
+          buf = buf.slice(cut + 2);
+          let event = "message", data = "";
+          for (const line of block.split("\n")) {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) data += line.slice(5).trim();
+          }
+          if (event !== "message" || !data) continue;
+          const j = JSON.parse(data);
+          if (j.delta) {
+            if (!got) status.textContent = "";
+            got = true;
+            out.textContent += j.delta;
+            feed.scrollTop = feed.scrollHeight;
+          }
+        }
+      }
+    } catch (e) {
+      // Dropped connection or malformed event: stop reading here
+    }
+    if (!got) div.remove();
+    return got;
   }
 
   onClick("open-coach", () => {
@@ -271,13 +329,17 @@ function wireCoach() {
     status.textContent = "Thinking…";
     input.value = "";
     try {
-      const res = await fetch("/coach/chat", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ text: txt })
-      });
-      const j = await res.json();
-      push("assistant", j.reply || "Sorry, no reply.");
+      let streamed = false;
+      try { streamed = await streamReply(txt); } catch (e) { streamed = false; }
+      if (!streamed) {
+        const res = await fetch("/coach/chat", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ text: txt })
+        });
+        const j = await res.json();
+        push("assistant", j.reply || "Sorry, no reply.");
+      }
     } catch (e) {
       push("assistant", "I hit a snag. Try again.");
     } finally {
@@ -318,7 +380,9 @@ function wireTasks() {
 /* --------------------------------- Init -------------------------------- */
 async function init() {
   try {
-    await Promise.all([loadLeaderboard(), loadState()]);
+    // State first: it assigns this browser its player cookie
+    await loadState();
+    await loadLeaderboard();
     wireQuests();
     wireTasks();
     wireCoach();
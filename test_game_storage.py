@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+
+from game_storage import SQLiteStorage
+from networking_game import Game
+
+
+def seeded_db(path, *usernames):
+    game = Game()
+    storage = SQLiteStorage(path)
+    storage.save_users([game.register_user(name) for name in usernames])
+    storage.close()
+    return path
+
+
+def test_lazy_map_never_hands_out_two_copies_of_a_user(tmp_path):
+    path = seeded_db(str(tmp_path / "game.db"), "a", "b")
+    game = Game()
+    game.use_storage(SQLiteStorage(path), max_cached_users=1)
+
+    first = game.users["a"]
+    game.users["b"]  # evicts "a" while a request still holds it
+    second = game.users["a"]
+    assert first is second
+
+    game.add_points(first, 5)
+    game.add_points(second, 7)
+    assert game.get_rank("a")["entry"]["points"] == 12
+    assert [row["username"] for row in game.get_leaderboard()] == ["a", "b"]
+
+
+def state(game, usernames=None):
+    rows = {}
+    for name in sorted(usernames or game.users):
+        user = game.users[name]
+        game.refresh(user)  # shared mode: pick up other processes' changes
+        rows[name] = user.to_dict()
+    return rows
+
+
+def leaderboard_order(rows):
+    ranked = sorted(rows.values(), key=lambda u: (-u["points"], -u["streak"], u["username"]))
+    return [u["username"] for u in ranked]
+
+
+def play(game, *usernames):
+    for name in usernames:
+        user = game.users[name] if name in game.users else game.register_user(name)
+        game.assign_daily_tasks(user)
+        game.complete_task(user, user.tasks[0].id)
+        game.add_points(user, len(name))
+
+
+def reopened(path, **options):
+    game = Game()
+    game.use_storage(SQLiteStorage(path), **options)
+    return game
+
+
+def test_eager_storage_round_trip(tmp_path):
+    path = str(tmp_path / "game.db")
+    game = reopened(path)
+    play(game, "a", "bb", "a")
+    expected = state(game)
+    game.storage.close()
+
+    game = reopened(path)
+    assert state(game) == expected
+    assert [row["username"] for row in game.get_leaderboard()] == leaderboard_order(expected)
+
+
+def test_lazy_storage_round_trip(tmp_path):
+    path = seeded_db(str(tmp_path / "game.db"), "a", "b", "c")
+    game = reopened(path, max_cached_users=1)
+    play(game, "a", "ccc", "d")
+    expected = state(game)
+    leaderboard = game.get_leaderboard()
+    game.flush()
+    game.storage.close()
+
+    game = reopened(path, max_cached_users=1)
+    assert game.get_leaderboard() == leaderboard
+    assert state(game) == expected
+
+
+def test_shared_storage_round_trip(tmp_path):
+    path = seeded_db(str(tmp_path / "game.db"), "a")
+    first = reopened(path, shared=True)
+    second = reopened(path, shared=True)
+    play(first, "a", "bb")
+    play(second, "a", "ccc")
+
+    everyone = ["a", "bb", "ccc"]
+    expected = state(first, everyone)
+    assert state(second, everyone) == expected
+    assert [row["username"] for row in second.get_leaderboard()] == leaderboard_order(expected)
+    assert first.get_rank("bb") == second.get_rank("bb")
+    first.storage.close()
+    second.storage.close()
+    assert state(reopened(path)) == expected
+
+
+def test_a_failed_operation_leaves_no_partial_rows(tmp_path):
+    path = seeded_db(str(tmp_path / "game.db"), "a")
+    game = reopened(path)
+    user = game.users["a"]
+    game.assign_daily_tasks(user)
+    task_id = user.tasks[0].id
+
+    record = game.storage.record
+
+    def crash_on_complete(event):
+        if event["e"] == "complete":
+            raise OSError("simulated crash")
+        record(event)
+
+    game.storage.record = crash_on_complete
+    with pytest.raises(OSError):
+        game.complete_task(user, task_id)
+    game.storage.close()
+
+    stored = reopened(path).users["a"]
+    assert stored.points == 0
+    assert not stored.get_task(task_id).completed
+
+
+def test_a_user_being_changed_is_not_evicted(tmp_path):
+    path = seeded_db(str(tmp_path / "game.db"), "a", "b", "c")
+    game = reopened(path, max_cached_users=1)
+    game.add_points(game.users["a"], 5)
+
+    held, release = threading.Event(), threading.Event()
+
+    def hold_a():
+        with game.user_lock("a"):
+            held.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_a)
+    holder.start()
+    held.wait()
+    game.users["b"]
+    assert "a" in game.users.cached()
+    release.set()
+    holder.join()
+
+    game.users["c"]
+    assert "a" not in game.users.cached()
+    assert game.storage.load_user("a", game.level_lookup, game.badge_lookup).points == 5
@@ -0,0 +1,89 @@
+import itertools
+
+import pytest
+
+from heuristics import KeywordMatcher, heuristic_score, score_batch
+
+
+def reference_score(qtype, text, choice=""):
+    """The rubric as it was written before heuristics.py, kept verbatim."""
+    s, tips = 0, []
+    t = (text or "").lower().strip()
+    ch = (choice or "").lower().strip()
+
+    def has_any(kws): return any(k in t for k in kws)
+
+    if qtype == "outreach":
+        if len(t.split()) >= 30: s += 1
+        if has_any(["accessibility","design","los angeles"," la ","ux"]): s += 2
+        if has_any(["i'm","i am","student","engineer","uwaterloo","cs"]): s += 2
+        if has_any(["15","15-min","15 minute","15 minutes"]): s += 2
+        if has_any(["thanks","appreciate","understand if not","no worries","totally fine if not"]): s += 3
+        if s < 10:
+            tips += [
+                "Reference their work/location directly (e.g., “your accessibility case study in LA”).",
+                "Make a specific, time-boxed ask (e.g., 15 minutes next week).",
+                "Add a respectful opt-out line."
+            ]
+    elif qtype == "coffee":
+        qs = [q.strip("-• ").strip() for q in text.split("\n") if q.strip()]
+        if 2 <= len(qs) <= 4: s += 3
+        if any(q.endswith("?") for q in qs): s += 3
+        if any(k in " ".join(qs).lower() for k in ["roadmap","a/b","experiment","tradeoff","stakeholder","impact"]): s += 2
+        if len(set([q.split()[0].lower() if q else "" for q in qs])) > 1: s += 2
+        if s < 10:
+            tips += ["Ask ≤3 open-ended, product-specific questions (e.g., trade-offs, experiment design)."]
+    elif qtype == "followup":
+        if ch in ["monday","tuesday","48h","2 days","early next week"]: s += 3
+        if any(k in t for k in ["thanks","great meeting","appreciate"]): s += 2
+        if s < 5:
+            tips += ["Follow up within 48–72 hours (e.g., Monday). Keep the subject clear and short."]
+    elif qtype == "reciprocity":
+        if any(k in t for k in ["share","resource","intro","connect","notes","feedback","link"]): s += 3
+        if len(t.split()) >= 10: s += 2
+        if s < 5:
+            tips += ["Offer something concrete: relevant article, intro, or feedback summary."]
+
+    return max(0, min(s, 10)), tips
+
+
+PHRASES = [
+    "", "Hi Dana,", "I'm a CS student at UWaterloo", "I am an engineer",
+    "loved your accessibility case study in Los Angeles", "your UX design work",
+    "in LA next week", "could we do a 15-minute chat?", "15 minutes", "15-min call",
+    "thanks so much", "I appreciate it", "no worries if not", "totally fine if not",
+    "word " * 30, "happy to share my notes and a link", "I can intro you",
+    "great meeting you", "What's on the roadmap?", "- How do you run A/B experiments?",
+    "• What tradeoff surprised you?\n- Which stakeholder pushes back most?",
+    "How do you measure impact?\nHow", "WHY?", "\n\n", "cs",
+]
+TEXTS = ["\n".join(combo) for n in (1, 2, 3) for combo in itertools.combinations(PHRASES, n)]
+CHOICES = ["", "Monday", " tuesday ", "48h", "2 days", "early next week", "Friday"]
+QTYPES = ["outreach", "coffee", "followup", "reciprocity", "unknown"]
+
+
+@pytest.mark.parametrize("qtype", QTYPES)
+def test_heuristic_score_matches_the_original_rubric(qtype):
+    for i, text in enumerate(TEXTS):
+        choice = CHOICES[i % len(CHOICES)]
+        assert heuristic_score(qtype, text, choice) == reference_score(qtype, text, choice), (text, choice)
+
+
+@pytest.mark.parametrize("qtype", QTYPES)
+def test_score_batch_matches_single_scoring(qtype):
+    choices = [CHOICES[i % len(CHOICES)] for i in range(len(TEXTS))]
+    expected = [reference_score(qtype, t, c) for t, c in zip(TEXTS, choices)]
+    assert score_batch(qtype, TEXTS, choices) == expected
+
+
+def test_score_batch_rejects_mismatched_choices():
+    with pytest.raises(ValueError):
+        score_batch("followup", ["a", "b"], ["monday"])
+
+
+def test_keyword_matcher_matches_substring_search():
+    groups = {"short": ["15", "cs"], "long": ["15 minutes", "ux"], "overlap": ["15-min", "15 m"]}
+    matcher = KeywordMatcher(groups)
+    texts = ["", "15 minutes", "15-min", "cs ux", "a 15 mi", "physics", "1 5"]
+    expected = [{name for name, kws in groups.items() if any(k in t for k in kws)} for t in texts]
+    assert [matcher.match(t) for t in texts] == expected
@@ -1,6 +1,10 @@
 import sys
 sys.path.append('/home/oai/share')
-from networking_game import Game
+import threading
+
+import pytest
+
+from networking_game import Game, Module
 
 def run_test():
     game = Game()
@@ -27,5 +31,63 @@ def run_test():
             print('Module progress:', game.get_module_progress(user))
             print('User level:', user.level.name)
 
+def test_registered_module_is_available_and_assignable():
+    game = Game()
+    user = game.register_user('alice')
+    game.register_module(Module(
+        name='Extra', description='', mastery_threshold=5,
+        task_templates=[{'description': 'Do it', 'points': 3}],
+    ))
+    assert 'Extra' in game.get_available_modules(user)
+    game.assign_module_tasks(user, 'Extra')
+    assert len([t for t in user.tasks if t.module_name == 'Extra']) == 2
+    assert 'badge_module_extra' in game.badge_lookup
+
+def test_modules_are_read_only_and_cycles_are_rejected():
+    game = Game()
+    with pytest.raises(TypeError):
+        game.modules['Extra'] = None
+    graph = game.module_graph
+    with pytest.raises(ValueError):
+        game.register_module(Module(
+            name='Profile Optimization', description='', task_templates=[],
+            mastery_threshold=12, prerequisites=['Pitch Mastery'],
+        ))
+    assert game.module_graph is graph
+    assert game.modules['Profile Optimization'].prerequisites == []
+
+def test_concurrent_points_are_never_lost():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    game = Game()
+    users = [game.register_user(name) for name in ('alice', 'bob', 'carol')]
+
+    def worker(i):
+        for _ in range(300):
+            game.add_points(users[0], 1)
+            game.add_points(users[1 + i % 2], 2)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert users[0].points == 8 * 300
+    assert users[1].points == users[2].points == 4 * 300 * 2
+    assert list(game.ranking) == sorted(u.rank_key() for u in users)
+
+def test_badges_alias_follows_the_default_registry():
+    game = Game()
+    assert Game.BADGES == tuple(game.badge_registry)
+    assert Game.BADGES[0].id == 'badge_first_connection'
+    with pytest.raises(AttributeError):
+        game.BADGES = []
+    game.register_module(Module(name='Extra', description='', mastery_threshold=5, task_templates=[]))
+    assert game.BADGES[-1].id == 'badge_module_extra'
+    assert 'badge_module_extra' not in {badge.id for badge in Game.BADGES}
+
 if __name__ == '__main__':
     run_test()
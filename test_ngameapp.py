@@ -0,0 +1,284 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+import ngameapp
+
+
+def test_workers_racing_for_the_secret_key_all_read_the_same_key(tmp_path, monkeypatch):
+    monkeypatch.delenv("GAME_SECRET_KEY", raising=False)
+    monkeypatch.setattr(ngameapp, "SECRET_PATH", str(tmp_path / ".secret_key"))
+    keys = []
+    threads = [threading.Thread(target=lambda: keys.append(ngameapp.load_secret_key())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(keys) == 8
+    assert len(set(keys)) == 1 and keys[0]
+    assert [p.name for p in tmp_path.iterdir()] == [".secret_key"]
+
+
+def test_a_second_process_cannot_claim_a_per_process_store(tmp_path):
+    if ngameapp.fcntl is None:
+        pytest.skip("needs fcntl")
+    path = str(tmp_path / "save.json")
+    held = ngameapp.claim_store(path)
+    try:
+        # flock locks belong to the open file, so a second open conflicts
+        # just as another worker's would
+        with pytest.raises(RuntimeError):
+            ngameapp.claim_store(path)
+    finally:
+        held.close()
+    ngameapp.claim_store(path).close()
+
+
+def sse_events(body):
+    events = []
+    for block in body.decode("utf-8").split("\n\n"):
+        if not block.strip():
+            continue
+        event, data = "message", ""
+        for line in block.split("\n"):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data += line[5:].strip()
+        events.append((event, json.loads(data)))
+    return events
+
+
+def coach_stream_events(monkeypatch, stream):
+    monkeypatch.setattr(ngameapp, "sf_complete_stream", stream)
+    res = ngameapp.app.test_client().post("/coach/stream", json={"text": "hi"})
+    assert res.mimetype == "text/event-stream"
+    return sse_events(res.get_data())
+
+
+def test_coach_stream_relays_each_piece(monkeypatch):
+    events = coach_stream_events(monkeypatch, lambda prompt: iter(["Hi ", "there"]))
+    assert events == [("message", {"delta": "Hi "}), ("message", {"delta": "there"}),
+                      ("done", {"source": "snowflake"})]
+
+
+def test_coach_stream_falls_back_before_the_first_piece(monkeypatch):
+    def failing(prompt):
+        raise RuntimeError("down")
+        yield
+
+    events = coach_stream_events(monkeypatch, failing)
+    assert events == [("message", {"delta": ngameapp.coach_result(None)["reply"]}),
+                      ("done", {"source": "local"})]
+
+
+def test_coach_stream_marks_a_broken_stream_truncated(monkeypatch):
+    def breaks(prompt):
+        yield "Hi"
+        raise RuntimeError("reset")
+
+    events = coach_stream_events(monkeypatch, breaks)
+    assert events == [("message", {"delta": "Hi"}),
+                      ("done", {"source": "snowflake", "truncated": True})]
+
+
+def test_competitors_are_seeded_once_through_the_game_api():
+    threads = [threading.Thread(target=ngameapp.seed_competitors) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    nova = ngameapp.game.users["Nova-A12"]
+    ngameapp.game.refresh(nova)
+    assert nova.points == 220
+    assert nova.level.name == "Industry Insider"
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.005)
+
+
+class StubbedPool(ngameapp.ScenarioPool):
+    """A ScenarioPool whose scenarios come from a counter, not Cortex."""
+    def __init__(self, qtypes, **kwargs):
+        super().__init__(qtypes, **kwargs)
+        self.generated = []
+        self.gates = {}  # qtype -> Event the generator waits on
+
+    def _generate(self, qtype):
+        gate = self.gates.get(qtype)
+        if gate is not None:
+            gate.wait()
+        self.generated.append(qtype)
+        return f"{qtype}-{len(self.generated)}"
+
+
+def test_scenario_pool_starts_on_first_pop_and_fills_up():
+    pool = StubbedPool(["outreach"], size=3, low_water=2)
+    pool.gates["outreach"] = gate = threading.Event()
+    assert pool._thread is None
+    assert pool.pop("outreach") is None
+    assert pool._thread is not None
+    gate.set()
+    wait_until(lambda: len(pool._pools["outreach"]) == 3)
+    assert pool.pop("unknown") is None
+
+
+def test_scenario_pool_refills_only_below_low_water():
+    pool = StubbedPool(["outreach"], size=3, low_water=2)
+    pool.start()
+    wait_until(lambda: len(pool._pools["outreach"]) == 3)
+    assert pool.pop("outreach") == "outreach-1"
+    time.sleep(0.05)
+    assert len(pool.generated) == 3  # 2 left is not below low water
+    pool.pop("outreach")
+    wait_until(lambda: len(pool.generated) == 5)
+    assert len(pool._pools["outreach"]) == 3
+
+
+def test_scenario_pool_rescans_after_a_pop_during_a_pass():
+    pool = StubbedPool(["coffee", "outreach"], size=2, low_water=2)
+    pool.gates["outreach"] = gate = threading.Event()
+    pool.start()  # first pass: fills coffee, then blocks on outreach
+    wait_until(lambda: len(pool._pools["coffee"]) == 2)
+    pool.pop("coffee")  # drained while the pass is still running
+    gate.set()
+    wait_until(lambda: len(pool._pools["outreach"]) == 2)
+    wait_until(lambda: len(pool._pools["coffee"]) == 2)
+
+
+@pytest.fixture
+def scoring(monkeypatch):
+    """Deadline scoring without batching, with a fresh calibration log."""
+    monkeypatch.setattr(ngameapp, "SCORE_DEADLINE", 0.05)
+    monkeypatch.setattr(ngameapp, "score_batcher", None)
+    monkeypatch.setattr(ngameapp, "score_calibration", ngameapp.ScoreCalibration())
+
+
+def test_slow_scorer_loses_the_deadline_race(monkeypatch, scoring):
+    release = threading.Event()
+
+    def slow_complete(prompt, max_tokens=300):
+        release.wait()
+        return '{"score": 9, "tips": ["late"]}'
+
+    monkeypatch.setattr(ngameapp, "sf_complete", slow_complete)
+    text = "Thanks! I'm a student — could we do 15 minutes?"
+    started = time.monotonic()
+    content = ngameapp.score_reply_within_deadline("outreach", text, "")
+    assert content is None
+    assert time.monotonic() - started < 1
+
+    user = ngameapp.game.register_user("deadline-player")
+    result = ngameapp.quest_score_result(user, "outreach", text, "", content)
+    heuristic, _ = ngameapp.heuristic_score("outreach", text, "")
+    assert result["source"] == "local"
+    assert result["earned"] == heuristic
+
+    # The late reply is only recorded for calibration, never awarded
+    release.set()
+    wait_until(lambda: ngameapp.score_calibration.stats())
+    assert ngameapp.score_calibration.stats() == {"outreach": {"n": 1, "mean_delta": 9 - heuristic}}
+    assert ngameapp.game.users["deadline-player"].points == heuristic
+
+
+def test_fast_scorer_wins_the_deadline_race(monkeypatch, scoring):
+    monkeypatch.setattr(ngameapp, "sf_complete", lambda prompt, max_tokens=300: '{"score": 7}')
+    assert ngameapp.score_reply_within_deadline("coffee", "Why?", "") == '{"score": 7}'
+    assert ngameapp.score_calibration.stats() == {}
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"results": [{"id": 2, "score": 4, "tips": ["b"]}, {"id": 1, "score": 8}]}',
+     [{"score": 8, "tips": []}, {"score": 4, "tips": ["b"]}, None]),
+    ('{"results": [{"id": 1, "score": 3}, {"id": 1, "score": 9}, {"id": 7, "score": 5}]}',
+     [{"score": 3, "tips": []}, None, None]),
+    ('{"results": [{"score": 5}, {"id": "x"}, "junk", {"id": 3, "score": "ten"}]}', [None, None, None]),
+    ("Sorry, I can't score these.", [None, None, None]),
+    ('{"results": [{"id": 1, "score": 6', [None, None, None]),
+    ("", [None, None, None]),
+])
+def test_parse_score_batch_reply(content, expected):
+    replies = ngameapp.parse_score_batch_reply(content, 3)
+    assert [json.loads(r) if r is not None else None for r in replies] == expected
+
+
+class FakeCortex:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt, max_tokens=300):
+        with self.lock:
+            self.calls.append((prompt, max_tokens))
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+
+def batcher(window=0.2, max_items=8):
+    return ngameapp.ScoreBatcher(window=window, max_items=max_items,
+                                 executor=ngameapp.ThreadPoolExecutor(max_workers=2))
+
+
+def test_submissions_within_a_window_share_one_call(monkeypatch):
+    cortex = FakeCortex('{"results": [{"id": 1, "score": 8}, {"id": 2, "score": 2}, {"id": 3, "score": 5}]}')
+    monkeypatch.setattr(ngameapp, "sf_complete", cortex)
+    b = batcher()
+    futures = [b.submit("outreach", f"text {i}", "") for i in range(3)]
+    replies = [json.loads(f.result(timeout=5)) for f in futures]
+    assert [r["score"] for r in replies] == [8, 2, 5]
+    assert len(cortex.calls) == 1
+    prompt, max_tokens = cortex.calls[0]
+    assert "#3 Task=outreach" in prompt and "text 2" in prompt
+    assert max_tokens == ngameapp.SCORE_TOKENS_PER_ITEM * 3
+
+
+def test_a_lone_submission_uses_the_single_item_prompt(monkeypatch):
+    cortex = FakeCortex('{"score": 6, "tips": []}')
+    monkeypatch.setattr(ngameapp, "sf_complete", cortex)
+    assert batcher(window=0.01).submit("coffee", "Why?", "").result(timeout=5) == '{"score": 6, "tips": []}'
+    assert cortex.calls == [(ngameapp.quest_score_prompt("coffee", "Why?", ""), 300)]
+
+
+def test_batches_are_capped_at_max_items(monkeypatch):
+    cortex = FakeCortex(lambda prompt: '{"results": []}' if "#2" in prompt else '{"score": 1}')
+    monkeypatch.setattr(ngameapp, "sf_complete", cortex)
+    b = batcher(window=0.2, max_items=2)
+    futures = [b.submit("followup", str(i), "") for i in range(5)]
+    for f in futures:
+        f.result(timeout=5)
+    assert len(cortex.calls) == 3
+
+
+def test_items_missing_from_a_short_reply_fall_back_to_the_heuristic(monkeypatch):
+    cortex = FakeCortex('{"results": [{"id": 1, "score": 9, "tips": ["ok"]}]}')
+    monkeypatch.setattr(ngameapp, "sf_complete", cortex)
+    b = batcher()
+    text = "Happy to share my notes and a link to the deck we discussed today"
+    first, second = b.submit("reciprocity", "x", ""), b.submit("reciprocity", text, "")
+    assert json.loads(first.result(timeout=5))["score"] == 9
+    assert second.result(timeout=5) is None
+
+    user = ngameapp.game.register_user("batch-player")
+    result = ngameapp.quest_score_result(user, "reciprocity", text, "", second.result())
+    assert result["source"] == "local"
+    assert result["earned"] == ngameapp.heuristic_score("reciprocity", text, "")[0]
+
+
+def test_a_failed_batch_call_fails_every_item(monkeypatch):
+    monkeypatch.setattr(ngameapp, "sf_complete", FakeCortex(RuntimeError("down")))
+    b = batcher()
+    futures = [b.submit("outreach", str(i), "") for i in range(2)]
+    for f in futures:
+        with pytest.raises(RuntimeError):
+            f.result(timeout=5)
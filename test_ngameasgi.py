@@ -0,0 +1,13 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+pytest.importorskip("asgiref")
+import ngameapp
+import ngameasgi
+
+
+def test_a_malformed_cookie_does_not_hide_the_session():
+    cookie = ngameapp.session_cookie("alice").split(";", 1)[0]
+    scope = {"headers": [(b"cookie", f"a=b; bad key=c; {cookie}".encode())]}
+    assert ngameasgi.request_player_name(scope) == ("alice", "alice")
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+
+from networking_game import EventLog, Game
+
+
+def restart(log_path):
+    """Rebuild a game from its log the way ngameapp.load_all does."""
+    game = Game()
+    game.replay_log(log_path)
+    game.attach_event_log(log_path)
+    return game
+
+
+def test_torn_record_does_not_swallow_later_events(tmp_path):
+    log_path = str(tmp_path / "save.log")
+    game = restart(log_path)
+    game.add_points(game.register_user("a"), 5)
+    game.detach_event_log()
+    # Simulate a crash in the middle of writing a record
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write('{"e":"stats","u":"a","p":9')
+
+    game = restart(log_path)
+    game.add_points(game.users["a"], 20)
+    game.register_user("b")
+    game.detach_event_log()
+
+    game = restart(log_path)
+    assert game.users["a"].points == 25
+    assert "b" in game.users
+    game.detach_event_log()
+
+
+def test_truncate_torn_tail_keeps_complete_records(tmp_path):
+    path = str(tmp_path / "log")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"e":"register","u":"a"}\n{"e":"reg')
+    EventLog.truncate_torn_tail(path)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == '{"e":"register","u":"a"}\n'
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"e":"reg')
+    EventLog.truncate_torn_tail(path)
+    assert os.path.getsize(path) == 0
+
+
+def state(game):
+    return {name: game.users[name].to_dict() for name in sorted(game.users)}
+
+
+def play(game, *usernames):
+    for name in usernames:
+        user = game.users[name] if name in game.users else game.register_user(name)
+        game.assign_daily_tasks(user)
+        game.complete_task(user, user.tasks[0].id)
+        game.add_points(user, len(name))
+
+
+def reopen(save_path, log_path):
+    """Load a snapshot plus log the way ngameapp.load_all does in log mode."""
+    game = Game()
+    if os.path.exists(save_path):
+        game.load(save_path, log_path=log_path)
+    else:
+        game.replay_log(log_path)
+    game.attach_event_log(log_path)
+    return game
+
+
+def test_snapshot_and_log_round_trip(tmp_path):
+    save_path, log_path = str(tmp_path / "save.json"), str(tmp_path / "save.log")
+    game = reopen(save_path, log_path)
+    play(game, "a", "b")
+    game.compact(save_path)
+    play(game, "b", "c")
+    expected = state(game)
+    game.detach_event_log()
+
+    assert not os.path.exists(EventLog.rotated_path(log_path))
+    game = reopen(save_path, log_path)
+    assert state(game) == expected
+    ranked = sorted(expected.values(), key=lambda u: (-u["points"], -u["streak"], u["username"]))
+    assert [row["username"] for row in game.get_leaderboard()] == [u["username"] for u in ranked]
+    game.detach_event_log()
+
+
+def test_compaction_interrupted_before_the_snapshot(tmp_path):
+    save_path, log_path = str(tmp_path / "save.json"), str(tmp_path / "save.log")
+    game = reopen(save_path, log_path)
+    play(game, "a")
+    game.compact(save_path)
+    play(game, "a", "b")
+    game.event_log.rotate()  # crash: rotated, but no snapshot written
+    play(game, "c")
+    expected = state(game)
+    game.detach_event_log()
+
+    game = reopen(save_path, log_path)
+    assert state(game) == expected
+    # The next compaction folds the leftover segment in as well
+    play(game, "d")
+    expected = state(game)
+    game.compact(save_path)
+    game.detach_event_log()
+    assert not os.path.exists(EventLog.rotated_path(log_path))
+    assert state(reopen(save_path, log_path)) == expected
+
+
+def test_compaction_interrupted_before_removing_the_segment(tmp_path):
+    save_path, log_path = str(tmp_path / "save.json"), str(tmp_path / "save.log")
+    game = reopen(save_path, log_path)
+    play(game, "a", "b")
+    game.event_log.rotate()
+    game.save(save_path)  # crash: snapshot in place, segment not yet removed
+    play(game, "a")
+    expected = state(game)
+    game.detach_event_log()
+
+    game = reopen(save_path, log_path)
+    assert state(game) == expected
+    game.detach_event_log()
+
+
+def test_concurrent_saves_all_succeed(tmp_path):
+    save_path = str(tmp_path / "save.json")
+    game = Game()
+    play(game, "a", "b")
+    errors = []
+
+    def worker():
+        for _ in range(20):
+            try:
+                game.save(save_path)
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert os.listdir(tmp_path) == ["save.json"]
+    loaded = Game()
+    loaded.load(save_path)
+    assert state(loaded) == state(game)
+
+
+def test_an_operation_is_logged_as_one_record(tmp_path):
+    log_path = str(tmp_path / "save.log")
+    game = restart(log_path)
+    user = game.register_user("a")
+    game.assign_daily_tasks(user)
+    game.detach_event_log()
+    with open(log_path, encoding="utf-8") as f:
+        before = f.read()
+
+    game = restart(log_path)
+    user = game.users["a"]
+    game.complete_task(user, user.tasks[0].id)
+    game.detach_event_log()
+    with open(log_path, encoding="utf-8") as f:
+        added = f.read()[len(before):].splitlines()
+    assert len(added) == 1
+    record = json.loads(added[0])
+    assert record["e"] == "group"
+    assert {"stats", "complete"} <= {e["e"] for e in record["events"]}
+
+    # A crash mid-record loses the whole completion, never just part of it
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(before + added[0][:-10])
+    game = restart(log_path)
+    assert game.users["a"].points == 0
+    assert not game.users["a"].tasks[0].completed
+    game.detach_event_log()
+
+
+def test_save_keeps_the_snapshot_file_mode(tmp_path):
+    save_path = str(tmp_path / "save.json")
+    game = Game()
+    game.save(save_path)
+    assert os.stat(save_path).st_mode & 0o777 == 0o644
+    os.chmod(save_path, 0o640)
+    game.save(save_path)
+    assert os.stat(save_path).st_mode & 0o777 == 0o640
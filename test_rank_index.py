@@ -0,0 +1,41 @@
+import random
+
+from networking_game import Game, RankIndex
+
+
+def test_rank_index_matches_a_sorted_list():
+    rng = random.Random(7)
+    index, expected = RankIndex(), []
+    for step in range(2000):
+        if expected and rng.random() < 0.4:
+            key = rng.choice(expected)
+            index.remove(key)
+            expected.remove(key)
+        else:
+            key = (-rng.randrange(100), -rng.randrange(5), f"u{step}")
+            index.insert(key)
+            expected.append(key)
+        expected.sort()
+        if step % 100 == 0:
+            assert list(index) == expected
+            assert len(index) == len(expected)
+
+    assert list(index) == expected
+    for position, key in enumerate(expected):
+        assert index.rank(key) == position
+        assert index[position] == key
+    assert list(index.iter_from(len(expected) // 2)) == expected[len(expected) // 2:]
+
+
+def test_leaderboard_follows_points_and_streak():
+    game = Game()
+    rng = random.Random(3)
+    for name in ("a", "b", "c", "d", "e"):
+        user = game.register_user(name)
+        game.add_points(user, rng.randrange(50))
+    game.add_points(game.users["c"], 100)
+
+    expected = sorted(game.users.values(), key=lambda u: (-u.points, -u.streak, u.username))
+    assert [row["username"] for row in game.get_leaderboard()] == [u.username for u in expected]
+    for position, user in enumerate(expected):
+        assert game.get_rank(user.username)["rank"] == position + 1
@@ -0,0 +1,271 @@
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+import snowflake_client
+from snowflake_client import (CircuitBreaker, CircuitOpenError, ResponseCache, SnowflakeBadRequest,
+                              SnowflakeError, _extract_delta, sf_complete, sf_complete_stream)
+
+
+class FakeClock:
+    """Stands in for the time module inside snowflake_client."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(snowflake_client, "time", fake)
+    return fake
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, lines=()):
+        self.status_code = status_code
+        self.reason = "OK" if status_code < 400 else "Error"
+        self.text = json.dumps(body or {})
+        self._body = body or {}
+        self._lines = list(lines)
+
+    def json(self):
+        return self._body
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self._lines:
+            if isinstance(line, Exception):
+                raise line
+            yield line
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+        self.on_post = None  # e.g. advance a fake clock to simulate latency
+
+    def post(self, url, **kwargs):
+        self.calls.append(kwargs)
+        if self.on_post is not None:
+            self.on_post()
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def cortex(monkeypatch):
+    """Configure the client and give each test a fresh breaker and session."""
+    monkeypatch.setattr(snowflake_client, "BASE", "https://example.invalid")
+    monkeypatch.setattr(snowflake_client, "TOKEN", "token")
+    monkeypatch.setattr(snowflake_client, "breaker", CircuitBreaker())
+
+    def use(*responses):
+        session = FakeSession(*responses)
+        monkeypatch.setattr(snowflake_client, "_get_session", lambda: session)
+        return session
+    return use
+
+
+def delta_line(text, key="content"):
+    return "data: " + json.dumps({"choices": [{"delta": {key: text}}]})
+
+
+@pytest.mark.parametrize("line, expected", [
+    (delta_line("Hi"), "Hi"),
+    (delta_line("Hi", key="text"), "Hi"),
+    ("data:" + json.dumps({"choices": [{"delta": {}}]}), ""),
+    ("data: [DONE]", ""),
+    ("data: not json", ""),
+    ("data: []", ""),
+    (": keep-alive", ""),
+    ("event: ping", ""),
+    ("", ""),
+])
+def test_extract_delta(line, expected):
+    assert _extract_delta(line) == expected
+
+
+def test_stream_yields_deltas_without_feeding_the_timeout_window(cortex):
+    session = cortex(FakeResponse(lines=[": keep-alive", "", delta_line("Hel"), "data: not json",
+                                         delta_line("lo"), "data: [DONE]"]))
+    assert list(sf_complete_stream("hi")) == ["Hel", "lo"]
+    assert session.calls[0]["stream"] is True
+    assert json.loads(session.calls[0]["data"])["stream"] is True
+    assert snowflake_client.breaker.state == CircuitBreaker.CLOSED
+    assert snowflake_client.breaker.p99() is None
+    assert not snowflake_client.breaker._latencies
+
+
+def test_stream_failure_counts_against_the_breaker(cortex):
+    cortex(FakeResponse(lines=[delta_line("Hel"), ConnectionError("reset")]))
+    stream = sf_complete_stream("hi")
+    assert next(stream) == "Hel"
+    with pytest.raises(ConnectionError):
+        next(stream)
+    assert snowflake_client.breaker.stats()["consecutive_failures"] == 1
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.max_failures):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(max_failures=3, cooldown=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.record_success(0.5)  # a success resets the count
+    assert breaker.state == CircuitBreaker.CLOSED
+    open_breaker(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = CircuitBreaker(max_failures=2, cooldown=30)
+    open_breaker(breaker)
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.advance(1)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # probe already in flight
+    breaker.record_success(0.5)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_for_a_full_cooldown(clock):
+    breaker = CircuitBreaker(max_failures=2, cooldown=30)
+    open_breaker(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.advance(1)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_timeout_follows_p99_latency_within_bounds():
+    breaker = CircuitBreaker(min_timeout=2, max_timeout=30, headroom=1.5, min_samples=20)
+    for _ in range(19):
+        breaker.record_success(1.0)
+    assert breaker.timeout() == 30  # too few samples to trust
+    for _ in range(80):
+        breaker.record_success(1.0)
+    breaker.record_success(4.0)
+    assert breaker.p99() == 4.0
+    assert breaker.timeout() == 6.0
+
+    fast = CircuitBreaker(min_timeout=2, max_timeout=30, min_samples=1)
+    fast.record_success(0.1)
+    assert fast.timeout() == 2
+    slow = CircuitBreaker(min_timeout=2, max_timeout=30, min_samples=1)
+    slow.record_success(100)
+    assert slow.timeout() == 30
+
+
+def test_post_json_records_latency_and_uses_the_adaptive_timeout(cortex, clock):
+    session = cortex(FakeResponse(body={"choices": [{"message": {"content": " OK "}}]}))
+    snowflake_client.breaker.min_samples = 1
+    snowflake_client.breaker.record_success(4.0)
+    session.on_post = lambda: clock.advance(1.5)
+
+    assert sf_complete("ping") == "OK"
+    assert session.calls[0]["timeout"] == 6.0
+    assert sorted(snowflake_client.breaker._latencies) == [1.5, 4.0]
+
+
+def test_post_json_failures_trip_the_breaker_but_bad_requests_do_not(cortex, clock):
+    breaker = snowflake_client.breaker
+    session = cortex(*[FakeResponse(status_code=400) for _ in range(breaker.max_failures)],
+                     *[FakeResponse(status_code=503) for _ in range(breaker.max_failures)])
+    for _ in range(breaker.max_failures):
+        with pytest.raises(SnowflakeBadRequest):
+            sf_complete("bad")
+    assert breaker.state == CircuitBreaker.CLOSED
+    for _ in range(breaker.max_failures):
+        with pytest.raises(SnowflakeError):
+            sf_complete("down")
+    assert breaker.state == CircuitBreaker.OPEN
+    calls = len(session.calls)
+    with pytest.raises(CircuitOpenError):
+        sf_complete("down")
+    assert len(session.calls) == calls  # failed fast, no request sent
+
+
+def test_cache_key_ignores_whitespace_but_not_max_tokens():
+    assert ResponseCache.key("Say  hi\n", 50) == ResponseCache.key(" Say hi", 50)
+    assert ResponseCache.key("Say hi", 50) != ResponseCache.key("Say hi", 60)
+
+
+def test_cache_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=10)
+    cache.set("k", "reply")
+    clock.advance(10)
+    assert cache.get("k") == "reply"
+    clock.advance(0.5)
+    assert cache.get("k") is None
+
+
+def test_cache_evicts_the_least_recently_used_entry(clock):
+    cache = ResponseCache(ttl=10, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_cache_reloads_live_entries_from_disk(tmp_path, clock):
+    path = str(tmp_path / "cache.jsonl")
+    cache = ResponseCache(ttl=10, path=path)
+    cache.set("old", "stale")
+    clock.advance(5)
+    cache.set("k", "first")
+    cache.set("k", "second")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"k": "torn", "x"\n')
+    clock.advance(6)
+
+    reloaded = ResponseCache(ttl=10, path=path)
+    assert reloaded.get("k") == "second"
+    assert reloaded.get("old") is None
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["k"] for line in f] == ["k"]
+
+
+def test_sf_complete_serves_repeats_from_the_cache(cortex, clock):
+    session = cortex(FakeResponse(body={"choices": [{"message": {"content": "OK"}}]}))
+    cache = ResponseCache(ttl=10)
+    assert sf_complete("ping", cache=cache) == "OK"
+    assert sf_complete(" ping ", cache=cache) == "OK"
+    assert len(session.calls) == 1
@@ -0,0 +1,62 @@
+import os
+import threading
+
+import pytest
+
+from networking_game import CounterIdGenerator, Game, SnowflakeIdGenerator
+
+
+@pytest.mark.parametrize("make", [CounterIdGenerator, lambda: SnowflakeIdGenerator(7)])
+def test_ids_are_unique_under_concurrent_bulk_assignment(make):
+    generator = make()
+    ids = []
+
+    def worker():
+        ids.extend(generator("d") for _ in range(20000))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(ids)) == len(ids) == 80000
+
+
+def test_fixed_node_generators_do_not_repeat_after_restart():
+    first = CounterIdGenerator(node="n1")
+    issued = {first("d") for _ in range(3)}
+    restarted = CounterIdGenerator(node="n1")
+    assert not issued & {restarted("d") for _ in range(3)}
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_children_never_reuse_parent_ids():
+    random_node = CounterIdGenerator()
+    fixed_node = CounterIdGenerator(node="n1")
+    snowflake = SnowflakeIdGenerator(1)
+    parent_ids = {random_node("d"), fixed_node("d"), snowflake("d")}
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        results = [random_node("d")]
+        for generator in (fixed_node, snowflake):
+            try:
+                results.append(generator("d"))
+            except RuntimeError:
+                results.append("refused")
+        os.write(write_end, " ".join(results).encode())
+        os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    child_id, fixed_result, snowflake_result = os.read(read_end, 1024).decode().split()
+    assert child_id not in parent_ids
+    assert fixed_result == snowflake_result == "refused"
+
+
+def test_game_uses_pluggable_generator():
+    game = Game(task_ids=SnowflakeIdGenerator(2))
+    user = game.register_user("a")
+    game.assign_daily_tasks(user, num_tasks=3)
+    assert len({t.id for t in user.tasks}) == 3
+    assert all(t.id.startswith("d") for t in user.tasks)